@@ -1,19 +1,28 @@
 import streamlit as st
 import requests
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
-from collections import Counter
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
-from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER, TA_LEFT
-from reportlab.lib import colors
+from datetime import datetime, date
+import csv
 import io
-from supabase import create_client, Client
-import json
+import time
+import os
+from concurrent.futures import ThreadPoolExecutor
+from busqueda import (CircuitoAbiertoError, ClienteLimitado, LimitadorTasa, SingleFlight, buscar_en_paralelo,
+                      buscar_lote, buscar_tema, calcular_hash_contenido, clave_busqueda, consultar_webhook,
+                      crear_almacen_instantaneas, crear_cache_busquedas, crear_cliente_webhook,
+                      crear_pool_busquedas, deduplicar_articulos, dividir_rango_fechas, leer_temas,
+                      rangos_faltantes, sin_respuesta)
+from diagnostico import Traza, crear_registro_diagnostico, tamaño_profundo
+from estadisticas import (buscar_en_indice, calcular_agregados_graficos, calcular_estadisticas,
+                          construir_figura, construir_indice_texto, construir_indices_articulos,
+                          construir_tabla_resultados, estadisticas_por_tema, filtrar_posiciones)
+from exportacion import FORMATOS_EXPORTACION, CacheExportaciones, crear_pdf, crear_pool_pdf, iterar_articulos
+from historial import (HISTORIAL_POR_PAGINA, EscritorHistorial, crear_cliente, fila_busqueda,
+                       leer_pagina_historial, leer_resumen_temas)
+
+# Las librerías pesadas (ReportLab, Plotly, Supabase) no se importan aquí:
+# cada módulo las carga la primera vez que se usan (PDF, gráficos, historial).
+# benchmarks/tiempo_arranque.py mide el arranque en frío.
 
 # Configuración de la página
 st.set_page_config(
@@ -22,14 +31,88 @@ st.set_page_config(
     layout="wide"
 )
 
-# Inicializar Supabase
+# Inicializar Supabase (solo al abrir el historial)
 @st.cache_resource
 def init_supabase():
     url = st.secrets["supabase_url"]
     key = st.secrets["supabase_key"]
-    return create_client(url, key)
+    return crear_cliente(url, key)
+
+# Leer un parámetro opcional de configuración desde st.secrets
+def obtener_config(clave, defecto):
+    try:
+        return st.secrets.get(clave, defecto)
+    except FileNotFoundError:
+        return defecto
+
+# Traza por etapas de esta ejecución del script (ver diagnostico.Traza)
+traza = Traza()
+
+@st.cache_resource
+def init_registro_diagnostico():
+    return crear_registro_diagnostico(obtener_config)
+
+registro_diagnostico = init_registro_diagnostico()
+
+@st.cache_resource
+def init_cache_busquedas():
+    return crear_cache_busquedas(obtener_config)
+
+cache_busquedas = init_cache_busquedas()
+
+@st.cache_resource
+def init_cliente_webhook():
+    return crear_cliente_webhook(obtener_config)
+
+cliente_webhook = init_cliente_webhook()
+
+# Pool acotado y compartido para las consultas en paralelo al webhook
+@st.cache_resource
+def init_pool_busquedas():
+    return crear_pool_busquedas(obtener_config)
+
+pool_busquedas = init_pool_busquedas()
+
+# Un hilo para construir los índices de texto en segundo plano
+@st.cache_resource
+def init_pool_indices():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="indice_texto")
+
+pool_indices = init_pool_indices()
+
+@st.cache_resource
+def init_busquedas_en_curso():
+    return SingleFlight()
 
-supabase = init_supabase()
+busquedas_en_curso = init_busquedas_en_curso()
+
+@st.cache_resource
+def init_almacen_instantaneas():
+    return crear_almacen_instantaneas(obtener_config)
+
+almacen_instantaneas = init_almacen_instantaneas()
+
+@st.cache_resource
+def init_cache_exportaciones():
+    return CacheExportaciones(
+        directorio=obtener_config("exportaciones_dir", ".cache/exportaciones"),
+        max_bytes_total=int(obtener_config("exportaciones_total_mb", 512)) * 1024 * 1024
+    )
+
+cache_exportaciones = init_cache_exportaciones()
+
+# Pool de procesos para renderizar por secciones los PDF muy grandes
+@st.cache_resource
+def init_pool_pdf():
+    return crear_pool_pdf(obtener_config)
+
+pool_pdf = init_pool_pdf()
+
+# Límites de la búsqueda por lotes: temas por lote, temas buscados a la vez
+# y peticiones por segundo al webhook entre todos (0 = sin límite)
+LOTE_MAX_TEMAS = int(obtener_config("lote_max_temas", 50))
+LOTE_CONCURRENCIA = int(obtener_config("lote_concurrencia", 4))
+LOTE_PETICIONES_POR_SEGUNDO = float(obtener_config("lote_peticiones_por_segundo", 2.0))
 
 # CSS personalizado
 st.markdown("""
@@ -97,242 +180,492 @@ with st.sidebar:
         key="idioma_select"
     )
     
+    busqueda_paralela = st.checkbox(
+        "⚡ Búsqueda paralela por años",
+        value=True,
+        help="Divide rangos de varios años en consultas simultáneas más cortas",
+        key="busqueda_paralela"
+    )
+    
+    busqueda_incremental = st.checkbox(
+        "♻️ Reutilizar búsquedas anteriores",
+        value=True,
+        help="Si ya buscaste este tema en un rango más corto, solo se piden las fechas que faltan",
+        key="busqueda_incremental"
+    )
+    
     st.markdown("---")
     buscar_btn = st.button("🔍 Realizar Búsqueda", use_container_width=True, type="primary")
     
+    # Búsqueda por lotes: la misma ventana de fechas e idioma para varios temas
+    with st.expander("📚 Búsqueda por lotes"):
+        texto_temas = st.text_area(
+            "Temas (uno por línea)",
+            placeholder="machine learning\ndiabetes\nclimate change",
+            key="temas_lote"
+        )
+        archivo_temas = st.file_uploader(
+            "O sube una lista (.txt, o .csv con los temas en la primera columna)",
+            type=["txt", "csv"],
+            key="archivo_temas"
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            concurrencia_lote = st.number_input(
+                "Temas a la vez", min_value=1, max_value=max(LOTE_CONCURRENCIA, 1),
+                value=max(LOTE_CONCURRENCIA, 1), key="concurrencia_lote"
+            )
+        with col2:
+            tasa_lote = st.number_input(
+                "Peticiones/s", min_value=0.0, value=LOTE_PETICIONES_POR_SEGUNDO, step=0.5,
+                help="Límite de peticiones por segundo al servicio de búsqueda (0 = sin límite)",
+                key="tasa_lote"
+            )
+        buscar_lote_btn = st.button("🔍 Buscar lote", use_container_width=True)
+    
     st.markdown("---")
     st.subheader("📜 Historial de Búsquedas")
     if st.button("Ver Historial", use_container_width=True):
         st.session_state['mostrar_historial'] = True
+        st.session_state['historial_cursores'] = [None]
 
-# Función para guardar búsqueda en Supabase
-def guardar_busqueda(tema, fecha_inicio, fecha_fin, idioma, total_resultados):
-    try:
-        data = {
-            "tema": tema,
-            "fecha_inicio": fecha_inicio.strftime("%Y-%m-%d"),
-            "fecha_fin": fecha_fin.strftime("%Y-%m-%d"),
-            "idioma": idioma,
-            "total_resultados": total_resultados,
-            "fecha_busqueda": datetime.now().isoformat()
-        }
-        result = supabase.table("busquedas").insert(data).execute()
-        return result
-    except Exception as e:
-        st.error(f"Error al guardar en base de datos: {str(e)}")
-        return None
+# Página del historial (cacheada) con paginación por cursor
+@st.cache_data(ttl=300, show_spinner=False)
+def consultar_historial(cursor=None, limite=HISTORIAL_POR_PAGINA):
+    with traza.medir("supabase_historial"):
+        return leer_pagina_historial(init_supabase(), cursor, limite)
+
+# Agregados por tema calculados en la base de datos (ver supabase/historial.sql)
+@st.cache_data(ttl=300, show_spinner=False)
+def consultar_resumen_temas(limite=10):
+    return leer_resumen_temas(init_supabase(), limite)
+
+# Invalidar las cachés del historial cuando se escriben filas nuevas
+def invalidar_historial():
+    consultar_historial.clear()
+    consultar_resumen_temas.clear()
 
 # Función para obtener historial
-def obtener_historial():
+def obtener_historial(cursor=None):
     try:
-        result = supabase.table("busquedas").select("*").order("fecha_busqueda", desc=True).limit(10).execute()
-        return result.data
+        return consultar_historial(cursor)
     except Exception as e:
         st.error(f"Error al obtener historial: {str(e)}")
-        return []
+        return [], None
+
+@st.cache_resource
+def init_escritor_historial():
+    url = st.secrets["supabase_url"]
+    key = st.secrets["supabase_key"]
+    return EscritorHistorial(
+        lambda: crear_cliente(url, key),
+        ruta_pendientes=obtener_config("historial_pendientes_path", ".cache/historial_pendientes.jsonl"),
+        max_cola=int(obtener_config("historial_max_cola", 1000)),
+        tamaño_lote=int(obtener_config("historial_tamaño_lote", 50)),
+        espera_lote=float(obtener_config("historial_espera_lote", 1.0)),
+        reintentos=int(obtener_config("historial_reintentos", 4)),
+        backoff_base=float(obtener_config("historial_backoff_base", 1.0)),
+        intervalo_reenvio=float(obtener_config("historial_intervalo_reenvio", 60)),
+        al_escribir=invalidar_historial,
+        registro=registro_diagnostico
+    )
+
+escritor_historial = init_escritor_historial()
+
+# Función para guardar búsqueda en Supabase (en segundo plano, no bloquea)
+def guardar_busqueda(tema, fecha_inicio, fecha_fin, idioma, total_resultados):
+    guardar_busquedas([fila_busqueda(tema, fecha_inicio, fecha_fin, idioma, total_resultados)])
+
+# Varias búsquedas de una vez (un lote): se insertan juntas
+def guardar_busquedas(filas):
+    try:
+        escritor_historial.encolar_lote(filas)
+    except Exception as e:
+        st.error(f"Error al guardar en base de datos: {str(e)}")
+
+# Pintar métricas, gráfico por año y primeros artículos mientras llegan los tramos
+def mostrar_resultados_parciales(contenedor, tema, resultados, completados, total):
+    stats, df, _ = calcular_estadisticas(resultados)
+    with contenedor.container():
+        st.progress(
+            completados / total,
+            text=f"🔄 Recibidos {completados} de {total} tramos · {len(resultados)} artículos hasta ahora"
+        )
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Artículos", stats['total'])
+        col2.metric("Años Cubiertos", stats['año_max'] - stats['año_min'] + 1 if not df.empty else 0)
+        col3.metric("Autores Únicos", stats['autores_unicos'])
+        col4.metric("Fuentes", len(stats['fuentes']))
+        
+        if not df.empty:
+            fig_parcial = construir_figura('años', tema, {'por_año': df['año_num'].value_counts().sort_index()})
+            fig_parcial.update_layout(height=300)
+            st.plotly_chart(fig_parcial, use_container_width=True)
+        
+        for art in resultados[:20]:
+            st.markdown(f"- **{art.get('titulo', 'Sin título')}** ({art.get('año', 'N/A')})")
+        if len(resultados) > 20:
+            st.caption(f"... y {len(resultados) - 20} artículos más")
+
+# Refresco incremental: si una instantánea del mismo tema ya cubre parte de
+# la ventana, solo se piden al webhook los rangos que faltan y se unen con
+# lo guardado (la deduplicación posterior elimina solapes). Devuelve None si
+# no hay nada reutilizable.
+def buscar_incremental(clave, tema, fecha_inicio, fecha_fin, idioma):
+    cobertura = almacen_instantaneas.buscar_cobertura(tema, idioma, fecha_inicio, fecha_fin)
+    if cobertura is None:
+        return None
+    clave_previa, cubierto_inicio, cubierto_fin = cobertura
+    previos = almacen_instantaneas.cargar(clave_previa)
+    if previos is None:
+        return None
+    
+    faltantes = rangos_faltantes(fecha_inicio, fecha_fin, cubierto_inicio, cubierto_fin)
+    tramos = [tramo for inicio, fin in faltantes for tramo in dividir_rango_fechas(inicio, fin)]
+    rangos = ", ".join(f"{inicio:%Y-%m-%d} → {fin:%Y-%m-%d}" for inicio, fin in faltantes)
+    st.info(f"♻️ Reutilizando {len(previos)} artículos ya buscados ({cubierto_inicio:%Y-%m-%d} → {cubierto_fin:%Y-%m-%d}); solo se consulta: {rangos}")
+    
+    def buscar():
+        nuevos, fallidos = buscar_en_paralelo(cliente_webhook, pool_busquedas, tema, fecha_inicio, fecha_fin, idioma,
+                                              tramos=tramos, traza=traza)
+        resultados = previos + nuevos
+        if not fallidos:
+            cache_busquedas.guardar(clave, resultados)
+        return resultados, fallidos
+    
+    with st.spinner("🔄 Buscando solo las fechas nuevas..."):
+        try:
+            resultados, fallidos = busquedas_en_curso.ejecutar(clave, buscar)
+        except requests.exceptions.RequestException as e:
+            st.error(f"❌ Error al conectar con el servidor: {str(e)}")
+            return None
+    if fallidos:
+        rangos = ", ".join(f"{inicio:%Y-%m-%d} → {fin:%Y-%m-%d}" for inicio, fin in fallidos)
+        st.warning(f"⚠️ Algunos tramos nuevos no respondieron y se omitieron: {rangos}")
+        st.session_state['busqueda_completa'] = False
+    return resultados
 
 # Función para realizar la búsqueda
-def buscar_articulos(tema, fecha_inicio, fecha_fin, idioma):
-    url = "https://eriks20252.app.n8n.cloud/webhook/busqueda-cientifica"
-    
-    payload = {
-        "tema": tema,
-        "fechaInicio": fecha_inicio.strftime("%Y-%m-%d"),
-        "fechaFin": fecha_fin.strftime("%Y-%m-%d"),
-        "idioma": idioma
-    }
+def buscar_articulos(tema, fecha_inicio, fecha_fin, idioma, paralelo=False, incremental=False):
+    # Se pone a False si algún tramo falló y el resultado es parcial
+    st.session_state['busqueda_completa'] = True
+    clave = clave_busqueda(tema, fecha_inicio, fecha_fin, idioma)
+    en_cache = cache_busquedas.obtener(clave)
+    if en_cache is not None:
+        return en_cache
+    
+    if incremental:
+        resultados = buscar_incremental(clave, tema, fecha_inicio, fecha_fin, idioma)
+        if resultados is not None:
+            return resultados
+    
+    if paralelo and fecha_inicio.year < fecha_fin.year:
+        # Modo streaming: los resultados parciales se muestran según llegan
+        contenedor = st.empty()
+        contenedor.info("🔄 Buscando artículos científicos por tramos...")
+        
+        def al_recibir(parciales, completados, total):
+            mostrar_resultados_parciales(contenedor, tema, parciales, completados, total)
+        
+        def buscar():
+            resultados, fallidos = buscar_en_paralelo(cliente_webhook, pool_busquedas, tema, fecha_inicio, fecha_fin, idioma,
+                                                     al_recibir=al_recibir, traza=traza)
+            if resultados and not fallidos:
+                cache_busquedas.guardar(clave, resultados)
+            return resultados, fallidos
+        
+        try:
+            resultados, fallidos = busquedas_en_curso.ejecutar(
+                clave, buscar,
+                al_unirse=lambda: contenedor.info("🔄 Otra sesión está haciendo esta misma búsqueda; esperando su resultado...")
+            )
+        except requests.exceptions.RequestException as e:
+            contenedor.empty()
+            st.error(f"❌ Error al conectar con el servidor: {str(e)}")
+            return None
+        contenedor.empty()
+        
+        if fallidos and not resultados:
+            if cliente_webhook.circuito_abierto():
+                st.error("🚧 El servicio de búsqueda no está disponible en este momento. Intenta de nuevo en unos segundos.")
+            else:
+                st.error("❌ Ningún tramo de la búsqueda respondió. Intenta de nuevo más tarde.")
+            return None
+        if fallidos:
+            rangos = ", ".join(f"{inicio:%Y-%m-%d} → {fin:%Y-%m-%d}" for inicio, fin in fallidos)
+            st.warning(f"⚠️ Algunos tramos no respondieron y se omitieron: {rangos}")
+            st.session_state['busqueda_completa'] = False
+        return resultados
+    
+    def buscar():
+        resultados = consultar_webhook(cliente_webhook, tema, fecha_inicio, fecha_fin, idioma, traza=traza)
+        if resultados:
+            cache_busquedas.guardar(clave, resultados)
+        return resultados, []
     
     with st.spinner("🔄 Buscando artículos científicos..."):
         try:
-            response = requests.post(url, json=payload, timeout=120)
-            response.raise_for_status()
-            return response.json()
+            resultados, _ = busquedas_en_curso.ejecutar(clave, buscar)
+            return resultados
+        except CircuitoAbiertoError as e:
+            st.error(f"🚧 {str(e)}. El servicio de búsqueda falló varias veces seguidas.")
+            return None
         except requests.exceptions.Timeout:
-            st.error("⏱️ La búsqueda tardó demasiado. Intenta con un rango de fechas más pequeño.")
+            st.error("⏱️ La búsqueda tardó demasiado. Intenta con un rango de fechas más pequeño o activa la búsqueda paralela.")
             return None
         except requests.exceptions.RequestException as e:
             st.error(f"❌ Error al conectar con el servidor: {str(e)}")
             return None
 
-# Función para crear PDF mejorado
-def crear_pdf(resultados, tema, stats):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, 
-                           topMargin=0.75*inch, bottomMargin=0.75*inch,
-                           leftMargin=0.75*inch, rightMargin=0.75*inch)
-    story = []
-    styles = getSampleStyleSheet()
-    
-    # Estilos personalizados
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#1f77b4'),
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.grey,
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#1f77b4'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold'
-    )
-    
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['BodyText'],
-        fontSize=10,
-        alignment=TA_JUSTIFY,
-        spaceAfter=6
-    )
+# Temas del lote: los del cuadro de texto y los del archivo subido
+def temas_del_lote(texto, archivo):
+    lineas = texto or ""
+    if archivo is not None:
+        contenido = archivo.getvalue().decode("utf-8-sig", errors="replace")
+        if archivo.name.lower().endswith(".csv"):
+            contenido = "\n".join(fila[0] for fila in csv.reader(io.StringIO(contenido)) if fila)
+        lineas += "\n" + contenido
+    return leer_temas(lineas)
+
+# Búsqueda por lotes: como mucho "concurrencia" temas a la vez y "por_segundo"
+# peticiones al webhook entre todos. Cada tema usa la caché y guarda su
+# instantánea; al final los artículos de todos se deduplican juntos (cada uno
+# queda con el primer tema en que apareció) y el historial recibe una fila
+# por tema en una sola escritura. Devuelve (articulos, colapsados, por_tema),
+# donde colapsados suma los duplicados dentro de cada tema y entre temas,
+# o None si ningún tema devolvió artículos.
+def buscar_articulos_lote(temas, fecha_inicio, fecha_fin, idioma, concurrencia, por_segundo):
+    cliente = ClienteLimitado(cliente_webhook, LimitadorTasa(por_segundo))
+    estados = {tema: "⏳ En espera" for tema in temas}
+    contenedor = st.empty()
+    
+    def mostrar_progreso():
+        terminados = sum(not estado.startswith("⏳") for estado in estados.values())
+        with contenedor.container():
+            st.progress(terminados / len(temas), text=f"🔄 {terminados} de {len(temas)} temas terminados")
+            st.dataframe(pd.DataFrame({'Tema': list(estados), 'Estado': list(estados.values())}),
+                         use_container_width=True, hide_index=True)
+    
+    # Se ejecuta en los hilos del lote: nada de st.* aquí
+    def buscar(tema):
+        inicio = time.perf_counter()
+        resultados, fallidos, desde_cache = buscar_tema(cliente, pool_busquedas, cache_busquedas, busquedas_en_curso,
+                                                        tema, fecha_inicio, fecha_fin, idioma, traza=traza)
+        articulos, duplicados = deduplicar_articulos(resultados or [])
+        return {'articulos': articulos, 'duplicados': duplicados, 'fallidos': fallidos,
+                'cache': desde_cache, 'segundos': round(time.perf_counter() - inicio, 1)}
+    
+    def al_terminar(tema, resultado, error):
+        if error is not None:
+            estados[tema] = f"❌ {error}"
+        elif sin_respuesta(resultado['articulos'], resultado['fallidos']):
+            estados[tema] = "❌ Ningún tramo respondió"
+        elif resultado['fallidos']:
+            estados[tema] = f"⚠️ {len(resultado['articulos'])} artículos (sin respuesta en {len(resultado['fallidos'])} tramos)"
+        else:
+            estados[tema] = f"✅ {len(resultado['articulos'])} artículos" + (" (caché)" if resultado['cache'] else "")
+        mostrar_progreso()
+    
+    mostrar_progreso()
+    por_tema = buscar_lote(temas, buscar, concurrencia, al_terminar)
+    contenedor.empty()
+    
+    combinados = []
+    duplicados_temas = 0
+    filas_historial = []
+    resumen = []
+    for tema, (resultado, error) in por_tema.items():
+        resumen.append({'Tema': tema, 'Estado': estados[tema],
+                        'Duplicados': resultado['duplicados'] if resultado else None,
+                        'Segundos': resultado['segundos'] if resultado else None})
+        if resultado is None or sin_respuesta(resultado['articulos'], resultado['fallidos']):
+            continue
+        combinados.extend({**art, 'tema': tema} for art in resultado['articulos'])
+        duplicados_temas += resultado['duplicados']
+        filas_historial.append(fila_busqueda(tema, fecha_inicio, fecha_fin, idioma, len(resultado['articulos'])))
+        if resultado['articulos'] and not resultado['fallidos']:
+            almacen_instantaneas.guardar_en_segundo_plano(tema, fecha_inicio, fecha_fin, idioma, resultado['articulos'])
+    if filas_historial:
+        guardar_busquedas(filas_historial)
+    
+    errores = [tema for tema, (resultado, error) in por_tema.items()
+               if error is not None or sin_respuesta(resultado['articulos'], resultado['fallidos'])]
+    if errores and cliente_webhook.circuito_abierto():
+        st.error("🚧 El servicio de búsqueda no está disponible en este momento. Intenta de nuevo en unos segundos.")
+    if errores:
+        st.warning(f"⚠️ {len(errores)} temas no respondieron: {', '.join(errores)}")
+    if not combinados:
+        return None
     
-    small_style = ParagraphStyle(
-        'SmallText',
-        parent=styles['BodyText'],
-        fontSize=9,
-        textColor=colors.grey,
-        spaceAfter=4
+    resumen = pd.DataFrame(resumen).merge(
+        estadisticas_por_tema(construir_tabla_resultados(combinados)), on='Tema', how='left'
     )
-    
-    # Portada
-    story.append(Spacer(1, 1.5*inch))
-    story.append(Paragraph("📚 REPORTE DE BÚSQUEDA CIENTÍFICA", title_style))
-    story.append(Spacer(1, 0.3*inch))
-    story.append(Paragraph(f"Tema: {tema}", subtitle_style))
-    story.append(Paragraph(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}", subtitle_style))
-    story.append(Spacer(1, 0.5*inch))
-    
-    # Estadísticas resumen
-    story.append(Paragraph("📊 RESUMEN ESTADÍSTICO", heading_style))
-    
-    stats_data = [
-        ["Total de Artículos", str(stats['total'])],
-        ["Rango de Años", f"{stats['año_min']} - {stats['año_max']}"],
-        ["Autores Únicos", str(stats['autores_unicos'])],
-        ["Fuentes", ", ".join(stats['fuentes'])]
-    ]
-    
-    stats_table = Table(stats_data, colWidths=[2.5*inch, 4*inch])
-    stats_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e6f2ff')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-    ]))
-    
-    story.append(stats_table)
-    story.append(PageBreak())
-    
-    # Artículos
-    story.append(Paragraph("📄 ARTÍCULOS ENCONTRADOS", heading_style))
-    story.append(Spacer(1, 0.2*inch))
-    
-    for idx, art in enumerate(resultados, 1):
-        # Título del artículo
-        story.append(Paragraph(f"<b>{idx}. {art.get('titulo', 'Sin título')}</b>", body_style))
-        
-        # Información básica
-        info_lines = []
-        if art.get('autores') and art['autores'] != 'No especificado':
-            info_lines.append(f"<b>Autores:</b> {art['autores'][:200]}...")
-        info_lines.append(f"<b>Año:</b> {art.get('año', 'N/A')}")
-        if art.get('venue'):
-            info_lines.append(f"<b>Publicado en:</b> {art['venue']}")
-        info_lines.append(f"<b>Fuente:</b> {art.get('fuente', 'N/A')}")
-        
-        for line in info_lines:
-            story.append(Paragraph(line, small_style))
-        
-        # DOI y URL
-        if art.get('doi'):
-            story.append(Paragraph(f"<b>DOI:</b> {art['doi']}", small_style))
-        if art.get('url'):
-            story.append(Paragraph(f"<b>URL:</b> <link href='{art['url']}'>{art['url'][:80]}...</link>", small_style))
-        
-        # Resumen
-        if art.get('resumen') and art['resumen'] != 'Resumen no disponible':
-            resumen_text = art['resumen'][:500] + "..." if len(art['resumen']) > 500 else art['resumen']
-            story.append(Paragraph(f"<b>Resumen:</b> {resumen_text}", body_style))
-        
-        # Objetivo y Metodología
-        if art.get('objetivo') and art['objetivo'] != 'No especificado':
-            story.append(Paragraph(f"<b>Objetivo:</b> {art['objetivo'][:300]}", body_style))
-        
-        if art.get('metodologia') and art['metodologia'] != 'No especificada':
-            story.append(Paragraph(f"<b>Metodología:</b> {art['metodologia'][:300]}", body_style))
-        
-        # Palabras clave
-        if art.get('palabras_clave') and art['palabras_clave'] != 'No registradas':
-            story.append(Paragraph(f"<b>Palabras clave:</b> {art['palabras_clave'][:200]}", small_style))
-        
-        story.append(Spacer(1, 0.15*inch))
-        story.append(Paragraph("_" * 100, small_style))
-        story.append(Spacer(1, 0.15*inch))
-        
-        # Nueva página cada 3 artículos
-        if idx % 3 == 0 and idx < len(resultados):
-            story.append(PageBreak())
-    
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
-# Función para calcular estadísticas
-def calcular_estadisticas(resultados):
-    df = pd.DataFrame(resultados)
-    
-    # Limpiar años
-    df['año_num'] = pd.to_numeric(df['año'], errors='coerce')
-    df = df.dropna(subset=['año_num'])
-    
-    # Extraer todos los autores
-    todos_autores = []
-    for autores in df['autores']:
-        if autores and autores != 'No especificado':
-            todos_autores.extend([a.strip() for a in autores.split(',')])
-    
-    stats = {
-        'total': len(resultados),
-        'año_min': int(df['año_num'].min()) if not df.empty else 0,
-        'año_max': int(df['año_num'].max()) if not df.empty else 0,
-        'autores_unicos': len(set(todos_autores)),
-        'fuentes': df['fuente'].unique().tolist() if 'fuente' in df.columns else []
-    }
-    
-    return stats, df, todos_autores
+    with traza.medir("deduplicacion", articulos=len(combinados)) as datos:
+        articulos, colapsados = deduplicar_articulos(combinados)
+        datos['duplicados'] = colapsados
+    return articulos, duplicados_temas + colapsados, resumen
+
+# A partir de este número de artículos el PDF se renderiza en varios procesos
+PDF_UMBRAL_PROCESOS = int(obtener_config("pdf_umbral_procesos", 1500))
+
+# Generar el PDF solo bajo demanda, por secciones y directamente a disco;
+# devuelve la ruta del archivo, reutilizado mientras el contenido no cambie.
+def generar_pdf(clave_pdf, tabla, tema, stats):
+    ejecutor = pool_pdf if len(tabla) >= PDF_UMBRAL_PROCESOS else None
+    
+    def generar(archivo):
+        with traza.medir("pdf", articulos=len(tabla), procesos=ejecutor is not None) as datos:
+            crear_pdf(tabla, tema, stats, salida=archivo, ejecutor=ejecutor)
+            archivo.flush()
+            datos['bytes'] = os.fstat(archivo.fileno()).st_size
+    return cache_exportaciones.obtener(clave_pdf, "pdf", generar)
+
+# Generar una exportación de datos solo cuando se solicita, directamente a
+# disco y por bloques; se reutiliza por hash mientras el contenido no cambie
+def generar_exportacion(clave, tabla, formato):
+    _, _, exportar = FORMATOS_EXPORTACION[formato]
+    
+    def generar(archivo):
+        with traza.medir("exportacion", formato=formato, articulos=len(tabla)) as datos:
+            exportar(tabla, archivo)
+            archivo.flush()
+            datos['bytes'] = os.fstat(archivo.fileno()).st_size
+    return cache_exportaciones.obtener(clave, formato, generar)
+
+# Una sola tabla por conjunto de resultados, compartida entre sesiones
+@st.cache_resource(max_entries=32, ttl=3600, show_spinner=False)
+def construir_tabla_cacheada(hash_resultados, _resultados):
+    return construir_tabla_resultados(_resultados)
+
+# Claves de session state que apuntan a objetos de cache_resource: no son de
+# la sesión, todas las que abren los mismos resultados comparten uno solo
+CLAVES_COMPARTIDAS = {'tabla_resultados'}
+
+# Memoria de lo que guarda esta sesión, medida en profundidad. Devuelve
+# (propia, compartida): lo compartido se cuenta aparte porque no se libera
+# al cerrar la sesión ni se duplica al abrir otra.
+def memoria_sesion():
+    estado = st.session_state.to_dict()
+    propia = sum(tamaño_profundo(valor) for clave, valor in estado.items() if clave not in CLAVES_COMPARTIDAS)
+    compartida = sum(tamaño_profundo(estado[clave]) for clave in CLAVES_COMPARTIDAS if clave in estado)
+    return propia, compartida
+
+OPCIONES_POR_PAGINA = [10, 25, 50, 100]
+
+# Índices de filtro/orden, índice de texto, agregados y figuras: una vez por
+# conjunto de resultados y compartidos entre sesiones (de solo lectura)
+@st.cache_resource(max_entries=32, ttl=3600, show_spinner=False)
+def construir_indices_cacheados(hash_resultados, _df):
+    return construir_indices_articulos(_df)
+
+# El índice de texto se empieza a construir en segundo plano al cargar los
+# resultados (tarda segundos con decenas de miles de artículos); devuelve el
+# Future, y la primera consulta solo espera lo que falte
+@st.cache_resource(max_entries=32, ttl=3600, show_spinner=False)
+def construir_indice_texto_cacheado(hash_resultados, _df):
+    return pool_indices.submit(construir_indice_texto, _df)
+
+# Estadísticas memoizadas por hash de resultados. Se usa cache_resource para
+# no copiar el DataFrame en cada rerun: los objetos devueltos son de solo lectura.
+@st.cache_resource(max_entries=32, ttl=3600, show_spinner=False)
+def calcular_estadisticas_cacheado(hash_resultados, _tabla):
+    with traza.medir("estadisticas", articulos=len(_tabla)):
+        return calcular_estadisticas(_tabla)
+
+@st.cache_resource(max_entries=32, ttl=3600, show_spinner=False)
+def calcular_agregados_cacheados(hash_resultados, _df, _autores_frecuencia):
+    return calcular_agregados_graficos(_df, _autores_frecuencia)
+
+# Figuras de Plotly memoizadas por hash de resultados y tipo (el tema va en un título)
+@st.cache_resource(max_entries=128, ttl=3600, show_spinner=False)
+def construir_figura_cacheada(hash_resultados, tipo, tema, _agregados):
+    with traza.medir("grafico", tipo=tipo):
+        return construir_figura(tipo, tema, _agregados)
+
+# Guardar en session state solo la tabla columnar (compartida por hash).
+# "por_tema" es el resumen por tema de una búsqueda por lotes.
+def cargar_resultados_en_sesion(resultados, tema, por_tema=None):
+    hash_resultados = calcular_hash_contenido(resultados)
+    st.session_state['tabla_resultados'] = construir_tabla_cacheada(hash_resultados, resultados)
+    st.session_state['tema_busqueda'] = tema
+    st.session_state['hash_resultados'] = hash_resultados
+    st.session_state['estadisticas_lote'] = por_tema
+    _, df, _ = calcular_estadisticas_cacheado(hash_resultados, st.session_state['tabla_resultados'])
+    construir_indice_texto_cacheado(hash_resultados, df)
 
 # Mostrar historial si se solicitó
 if st.session_state.get('mostrar_historial', False):
     st.subheader("📜 Historial de Búsquedas Recientes")
-    historial = obtener_historial()
-    
-    if historial:
-        df_historial = pd.DataFrame(historial)
-        df_historial['fecha_busqueda'] = pd.to_datetime(df_historial['fecha_busqueda']).dt.strftime('%d/%m/%Y %H:%M')
-        st.dataframe(
-            df_historial[['tema', 'fecha_inicio', 'fecha_fin', 'idioma', 'total_resultados', 'fecha_busqueda']],
-            use_container_width=True
-        )
-    else:
-        st.info("No hay búsquedas en el historial.")
+    tab_recientes, tab_temas = st.tabs(["🕒 Recientes", "🏆 Temas más buscados"])
+    
+    with tab_recientes:
+        # Pila de cursores: el último es el de la página actual
+        cursores = st.session_state.setdefault('historial_cursores', [None])
+        historial, cursor_siguiente = obtener_historial(cursores[-1])
+        
+        if historial:
+            st.dataframe(pd.DataFrame(historial), use_container_width=True)
+            
+            # Reabrir búsquedas con instantánea guardada, sin volver a llamar al webhook
+            claves_historial = {
+                i: clave_busqueda(fila['tema'], date.fromisoformat(fila['fecha_inicio']),
+                                  date.fromisoformat(fila['fecha_fin']), fila['idioma'])
+                for i, fila in enumerate(historial)
+            }
+            con_instantanea = almacen_instantaneas.disponibles(claves_historial.values())
+            reabribles = [i for i, clave in claves_historial.items() if clave in con_instantanea]
+            if reabribles:
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    elegida = st.selectbox(
+                        "Búsqueda guardada:",
+                        reabribles,
+                        format_func=lambda i: f"{historial[i]['tema']} ({historial[i]['fecha_inicio']} → {historial[i]['fecha_fin']}, {historial[i]['idioma']}) · {historial[i]['fecha_busqueda']}",
+                        key="historial_reabrir"
+                    )
+                with col2:
+                    st.write("")
+                    reabrir = st.button("📂 Reabrir", use_container_width=True)
+                if reabrir:
+                    resultados_guardados = almacen_instantaneas.cargar(claves_historial[elegida])
+                    if resultados_guardados:
+                        cargar_resultados_en_sesion(resultados_guardados, historial[elegida]['tema'])
+                        st.session_state['mostrar_historial'] = False
+                        st.rerun()
+                    else:
+                        st.warning("⚠️ La instantánea de esta búsqueda ya no está disponible.")
+        else:
+            st.info("No hay búsquedas en el historial.")
+        
+        col1, col2, col3 = st.columns([1, 1, 4])
+        with col1:
+            if st.button("⬅️ Anteriores", disabled=len(cursores) == 1, use_container_width=True):
+                cursores.pop()
+                st.rerun()
+        with col2:
+            if st.button("Siguientes ➡️", disabled=cursor_siguiente is None, use_container_width=True):
+                cursores.append(cursor_siguiente)
+                st.rerun()
+        with col3:
+            st.caption(f"Página {len(cursores)}")
+    
+    with tab_temas:
+        try:
+            resumen_temas = consultar_resumen_temas()
+        except Exception as e:
+            resumen_temas = None
+            st.info(f"No se pudieron obtener los agregados por tema ({str(e)}). "
+                    "Requieren la función resumen_busquedas_por_tema de supabase/historial.sql.")
+        if resumen_temas:
+            df_temas = pd.DataFrame(resumen_temas).rename(columns={
+                'tema': 'Tema',
+                'busquedas': 'Búsquedas',
+                'promedio_resultados': 'Promedio de resultados',
+                'ultima_busqueda': 'Última búsqueda'
+            })
+            st.dataframe(df_temas, use_container_width=True)
+        elif resumen_temas is not None:
+            st.info("No hay búsquedas en el historial.")
     
     if st.button("Cerrar Historial"):
         st.session_state['mostrar_historial'] = False
@@ -345,29 +678,64 @@ if buscar_btn:
     elif fecha_inicio > fecha_fin:
         st.error("❌ La fecha de inicio debe ser anterior a la fecha fin.")
     else:
-        resultados = buscar_articulos(tema, fecha_inicio, fecha_fin, idioma)
+        with traza.medir("busqueda", paralelo=busqueda_paralela, incremental=busqueda_incremental) as datos:
+            resultados = buscar_articulos(tema, fecha_inicio, fecha_fin, idioma,
+                                          paralelo=busqueda_paralela, incremental=busqueda_incremental)
+            datos['articulos'] = len(resultados or [])
         
         if resultados and len(resultados) > 0:
-            st.success(f"✅ Se encontraron {len(resultados)} artículos")
+            with traza.medir("deduplicacion", articulos=len(resultados)) as datos:
+                resultados, duplicados = deduplicar_articulos(resultados)
+                datos['duplicados'] = duplicados
+            if duplicados:
+                st.success(f"✅ Se encontraron {len(resultados)} artículos ({duplicados} duplicados entre fuentes fusionados)")
+            else:
+                st.success(f"✅ Se encontraron {len(resultados)} artículos")
             
             # Guardar en Supabase
             guardar_busqueda(tema, fecha_inicio, fecha_fin, idioma, len(resultados))
             
-            # Guardar en session state
-            st.session_state['resultados'] = resultados
-            st.session_state['tema_busqueda'] = tema
+            # Instantánea para reabrir desde el historial (solo si la búsqueda está completa)
+            if st.session_state.get('busqueda_completa', True):
+                almacen_instantaneas.guardar_en_segundo_plano(tema, fecha_inicio, fecha_fin, idioma, resultados)
+            
+            cargar_resultados_en_sesion(resultados, tema)
             
         elif resultados is not None:
             st.warning("⚠️ No se encontraron artículos con los criterios especificados.")
         # Si resultados es None, ya se mostró el error en buscar_articulos()
 
+# Realizar búsqueda por lotes
+if buscar_lote_btn:
+    temas_lote = temas_del_lote(texto_temas, archivo_temas)
+    if not temas_lote:
+        st.warning("⚠️ Escribe o sube al menos un tema para la búsqueda por lotes.")
+    elif len(temas_lote) > LOTE_MAX_TEMAS:
+        st.error(f"❌ El lote tiene {len(temas_lote)} temas; el máximo es {LOTE_MAX_TEMAS}.")
+    elif fecha_inicio > fecha_fin:
+        st.error("❌ La fecha de inicio debe ser anterior a la fecha fin.")
+    else:
+        with traza.medir("lote", temas=len(temas_lote), concurrencia=int(concurrencia_lote)) as datos:
+            lote = buscar_articulos_lote(temas_lote, fecha_inicio, fecha_fin, idioma,
+                                         int(concurrencia_lote), float(tasa_lote))
+            datos['articulos'] = len(lote[0]) if lote else 0
+        
+        if lote:
+            articulos_lote, colapsados, por_tema = lote
+            st.success(f"✅ Se encontraron {len(articulos_lote)} artículos en {len(temas_lote)} temas"
+                       f" ({colapsados} repetidos entre temas o fuentes fusionados)")
+            cargar_resultados_en_sesion(articulos_lote, f"Lote de {len(temas_lote)} temas", por_tema)
+        else:
+            st.warning("⚠️ Ningún tema del lote devolvió artículos.")
+
 # Mostrar resultados si existen
-if 'resultados' in st.session_state and st.session_state['resultados']:
-    resultados = st.session_state['resultados']
+if st.session_state.get('tabla_resultados') is not None and len(st.session_state['tabla_resultados']) > 0:
+    tabla_resultados = st.session_state['tabla_resultados']
     tema_busqueda = st.session_state.get('tema_busqueda', 'Búsqueda')
+    hash_resultados = st.session_state['hash_resultados']
     
     # Calcular estadísticas
-    stats, df, todos_autores = calcular_estadisticas(resultados)
+    stats, df, autores_frecuencia = calcular_estadisticas_cacheado(hash_resultados, tabla_resultados)
     
     # Métricas principales
     st.subheader("📊 Estadísticas Descriptivas")
@@ -405,87 +773,76 @@ if 'resultados' in st.session_state and st.session_state['resultados']:
         </div>
         """, unsafe_allow_html=True)
     
+    # Resumen por tema si los resultados vienen de una búsqueda por lotes
+    por_tema = st.session_state.get('estadisticas_lote')
+    if por_tema is not None:
+        with st.expander(f"📚 Resultados por tema ({len(por_tema)} temas)", expanded=True):
+            st.dataframe(por_tema, use_container_width=True, hide_index=True)
+    
     st.markdown("---")
     
-    # Gráficos estadísticos
-    tab1, tab2, tab3, tab4 = st.tabs(["📈 Por Año", "👥 Autores Frecuentes", "📚 Por Fuente", "📄 Artículos"])
+    # Gráficos estadísticos: solo se construye y se envía la vista activa
+    agregados = calcular_agregados_cacheados(hash_resultados, df, autores_frecuencia)
+    vista = st.radio(
+        "Vista",
+        ["📈 Por Año", "👥 Autores Frecuentes", "📚 Por Fuente", "📄 Artículos"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="vista_resultados"
+    )
     
-    with tab1:
+    if vista == "📈 Por Año":
         st.subheader("Publicaciones por Año")
-        publicaciones_por_año = df['año_num'].value_counts().sort_index()
-        
-        fig_años = px.bar(
-            x=publicaciones_por_año.index,
-            y=publicaciones_por_año.values,
-            labels={'x': 'Año', 'y': 'Número de Publicaciones'},
-            title=f'Distribución Temporal de Publicaciones - {tema_busqueda}'
-        )
-        fig_años.update_traces(marker_color='#1f77b4')
-        fig_años.update_layout(showlegend=False, height=400)
-        st.plotly_chart(fig_años, use_container_width=True)
+        publicaciones_por_año = agregados['por_año']
+        st.plotly_chart(construir_figura_cacheada(hash_resultados, 'años', tema_busqueda, agregados), use_container_width=True)
         
         # Estadísticas adicionales por año
         col1, col2 = st.columns(2)
         with col1:
             st.metric("Año con más publicaciones", 
-                     publicaciones_por_año.idxmax(),
+                     int(publicaciones_por_año.idxmax()),
                      f"{publicaciones_por_año.max()} artículos")
         with col2:
             promedio = publicaciones_por_año.mean()
             st.metric("Promedio por año", f"{promedio:.1f}")
     
-    with tab2:
+    elif vista == "👥 Autores Frecuentes":
         st.subheader("Autores Más Frecuentes")
-        contador_autores = Counter(todos_autores)
-        top_autores = contador_autores.most_common(15)
+        df_autores = agregados['autores']
         
-        if top_autores:
-            df_autores = pd.DataFrame(top_autores, columns=['Autor', 'Publicaciones'])
-            
-            fig_autores = px.bar(
-                df_autores,
-                x='Publicaciones',
-                y='Autor',
-                orientation='h',
-                title='Top 15 Autores con Más Publicaciones'
-            )
-            fig_autores.update_traces(marker_color='#2ca02c')
-            fig_autores.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
-            st.plotly_chart(fig_autores, use_container_width=True)
+        if not df_autores.empty:
+            st.plotly_chart(construir_figura_cacheada(hash_resultados, 'autores', tema_busqueda, agregados), use_container_width=True)
             
             st.dataframe(df_autores, use_container_width=True)
         else:
             st.info("No hay suficientes datos de autores para mostrar.")
     
-    with tab3:
+    elif vista == "📚 Por Fuente":
         st.subheader("Distribución por Fuente")
-        fuentes_count = df['fuente'].value_counts()
         
         col1, col2 = st.columns(2)
         
         with col1:
-            fig_pie = px.pie(
-                values=fuentes_count.values,
-                names=fuentes_count.index,
-                title='Porcentaje por Fuente'
-            )
-            fig_pie.update_layout(height=400)
-            st.plotly_chart(fig_pie, use_container_width=True)
+            st.plotly_chart(construir_figura_cacheada(hash_resultados, 'fuentes_pie', tema_busqueda, agregados), use_container_width=True)
         
         with col2:
-            fig_bar_fuente = px.bar(
-                x=fuentes_count.index,
-                y=fuentes_count.values,
-                labels={'x': 'Fuente', 'y': 'Cantidad'},
-                title='Artículos por Fuente'
-            )
-            fig_bar_fuente.update_traces(marker_color='#ff7f0e')
-            fig_bar_fuente.update_layout(height=400)
-            st.plotly_chart(fig_bar_fuente, use_container_width=True)
+            st.plotly_chart(construir_figura_cacheada(hash_resultados, 'fuentes_barra', tema_busqueda, agregados), use_container_width=True)
     
-    with tab4:
+    else:
         st.subheader("Lista de Artículos Encontrados")
         
+        # Búsqueda de texto dentro de los resultados
+        consulta = st.text_input(
+            "🔎 Buscar en títulos, resúmenes y palabras clave",
+            placeholder="Ej: redes neuronales, encuesta, revisión sistemática",
+            key="consulta_articulos"
+        ).strip()
+        coincidencias = None
+        if consulta:
+            with st.spinner("🔄 Preparando el índice de búsqueda..."):
+                indice_texto = construir_indice_texto_cacheado(hash_resultados, df).result()
+            coincidencias = buscar_en_indice(indice_texto, consulta)
+        
         # Filtros
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -496,27 +853,35 @@ if 'resultados' in st.session_state and st.session_state['resultados']:
             fuente_filtro = st.selectbox("Filtrar por fuente:", ["Todas"] + stats['fuentes'])
         
         with col3:
-            orden = st.selectbox("Ordenar por:", ["Más recientes", "Más antiguos", "Título"])
+            opciones_orden = (["Relevancia"] if consulta else []) + ["Más recientes", "Más antiguos", "Título"]
+            orden = st.selectbox("Ordenar por:", opciones_orden)
         
-        # Aplicar filtros
-        df_filtrado = df.copy()
-        if año_filtro != "Todos":
-            df_filtrado = df_filtrado[df_filtrado['año_num'] == año_filtro]
-        if fuente_filtro != "Todas":
-            df_filtrado = df_filtrado[df_filtrado['fuente'] == fuente_filtro]
+        # Filtrar y ordenar con los índices precalculados (sin copiar la tabla)
+        with traza.medir("filtro_articulos", orden=orden) as datos:
+            indices = construir_indices_cacheados(hash_resultados, df)
+            seleccion = filtrar_posiciones(indices, año_filtro, fuente_filtro, orden, coincidencias)
+            datos['articulos'] = len(seleccion)
         
-        # Ordenar
-        if orden == "Más recientes":
-            df_filtrado = df_filtrado.sort_values('año_num', ascending=False)
-        elif orden == "Más antiguos":
-            df_filtrado = df_filtrado.sort_values('año_num', ascending=True)
-        else:
-            df_filtrado = df_filtrado.sort_values('titulo')
+        # Paginación: solo se crean widgets para la página actual
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            por_pagina = st.selectbox("Artículos por página:", OPCIONES_POR_PAGINA, index=1, key="articulos_por_pagina")
+        total_paginas = max(1, -(-len(seleccion) // por_pagina))
+        filtros_actuales = (consulta, año_filtro, fuente_filtro, orden, por_pagina)
+        if st.session_state.get('filtros_articulos') != filtros_actuales:
+            st.session_state['filtros_articulos'] = filtros_actuales
+            st.session_state['pagina_articulos'] = 1
+        st.session_state['pagina_articulos'] = min(st.session_state.get('pagina_articulos', 1), total_paginas)
+        with col2:
+            pagina = st.number_input(f"Página (de {total_paginas}):", min_value=1, max_value=total_paginas, key="pagina_articulos")
+        
+        inicio = (pagina - 1) * por_pagina
+        posiciones_pagina = seleccion[inicio:inicio + por_pagina]
         
         # Mostrar artículos
-        st.write(f"**Mostrando {len(df_filtrado)} de {len(df)} artículos**")
+        st.write(f"**Mostrando {inicio + 1 if len(seleccion) else 0}–{inicio + len(posiciones_pagina)} de {len(seleccion)} artículos filtrados ({len(df)} en total)**")
         
-        for idx, row in df_filtrado.iterrows():
+        for row in iterar_articulos(df.iloc[posiciones_pagina]):
             with st.expander(f"**{row['titulo']}** ({row['año']})"):
                 col1, col2 = st.columns([2, 1])
                 
@@ -554,26 +919,83 @@ if 'resultados' in st.session_state and st.session_state['resultados']:
     col1, col2 = st.columns(2)
     
     with col1:
-        # Descargar como CSV
-        csv = df.to_csv(index=False).encode('utf-8-sig')
-        st.download_button(
-            label="📊 Descargar CSV",
-            data=csv,
-            file_name=f"busqueda_{tema_busqueda}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv",
-            use_container_width=True
+        # Descargar los datos: el archivo se genera solo cuando se solicita
+        formato = st.selectbox(
+            "Formato",
+            list(FORMATOS_EXPORTACION),
+            format_func=lambda f: FORMATOS_EXPORTACION[f][0],
+            key="formato_exportacion"
         )
+        etiqueta_formato, mime_formato, _ = FORMATOS_EXPORTACION[formato]
+        clave_exportacion = calcular_hash_contenido(hash_resultados, formato)
+        if st.session_state.get('exportacion_solicitada') != clave_exportacion:
+            if st.button(f"📊 Generar {etiqueta_formato}", use_container_width=True):
+                st.session_state['exportacion_solicitada'] = clave_exportacion
+        
+        if st.session_state.get('exportacion_solicitada') == clave_exportacion:
+            with st.spinner(f"📊 Generando {etiqueta_formato}..."):
+                ruta_exportacion = generar_exportacion(clave_exportacion, df, formato)
+            with open(ruta_exportacion, "rb") as archivo_exportacion:
+                st.download_button(
+                    label=f"📊 Descargar {etiqueta_formato}",
+                    data=archivo_exportacion,
+                    file_name=f"busqueda_{tema_busqueda}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}",
+                    mime=mime_formato,
+                    use_container_width=True
+                )
     
     with col2:
-        # Descargar como PDF
-        pdf_buffer = crear_pdf(resultados, tema_busqueda, stats)
-        st.download_button(
-            label="📄 Descargar PDF",
-            data=pdf_buffer,
-            file_name=f"reporte_{tema_busqueda}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mime="application/pdf",
-            use_container_width=True
-        )
+        # Descargar como PDF: se genera solo cuando se solicita
+        clave_pdf = calcular_hash_contenido(hash_resultados, tema_busqueda, stats)
+        if st.session_state.get('pdf_solicitado') != clave_pdf:
+            if st.button("📄 Generar PDF", use_container_width=True):
+                st.session_state['pdf_solicitado'] = clave_pdf
+        
+        if st.session_state.get('pdf_solicitado') == clave_pdf:
+            with st.spinner("📄 Generando PDF..."):
+                ruta_pdf = generar_pdf(clave_pdf, tabla_resultados, tema_busqueda, stats)
+            with open(ruta_pdf, "rb") as archivo_pdf:
+                st.download_button(
+                    label="📄 Descargar PDF",
+                    data=archivo_pdf,
+                    file_name=f"reporte_{tema_busqueda}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
+
+# Estado de la caché de búsquedas
+with st.sidebar:
+    st.markdown("---")
+    estado_cache = cache_busquedas.estadisticas()
+    st.caption(
+        f"⚡ Caché de búsquedas: {estado_cache['aciertos_memoria'] + estado_cache['aciertos_disco']} aciertos "
+        f"({estado_cache['aciertos_memoria']} memoria, {estado_cache['aciertos_disco']} disco) · "
+        f"{estado_cache['fallos']} fallos · {estado_cache['entradas_memoria']} en memoria"
+    )
+    estado_historial = escritor_historial.estado()
+    if estado_historial['en_cola'] or estado_historial['pendientes']:
+        st.caption(f"📝 Historial: {estado_historial['en_cola']} búsquedas en cola, {estado_historial['pendientes']} guardadas localmente para reenviar")
+    if estado_historial['descartadas']:
+        st.caption(f"⚠️ Historial: {estado_historial['descartadas']} búsquedas rechazadas por la base de datos (ver registro de diagnóstico)")
+    memoria_propia, memoria_compartida = memoria_sesion()
+    st.caption(f"💾 Memoria de esta sesión: {memoria_propia / (1024 * 1024):.2f} MB"
+               f" (+ {memoria_compartida / (1024 * 1024):.2f} MB de resultados compartidos entre sesiones)")
+
+# Cerrar la traza de esta ejecución y registrarla
+traza.etapas.append({'etapa': 'ejecucion', 'ms': traza.total_ms()})
+registro_diagnostico.registrar("ejecucion", traza.etapas)
+
+# Panel de diagnóstico oculto: se activa con ?diagnostico=1 o con "diagnostico" en los secrets
+if st.query_params.get("diagnostico") == "1" or obtener_config("diagnostico", False):
+    with st.sidebar.expander("🩺 Diagnóstico", expanded=True):
+        st.caption("Esta ejecución")
+        st.dataframe(pd.DataFrame(traza.etapas), use_container_width=True, hide_index=True)
+        totales = registro_diagnostico.totales()
+        if totales:
+            resumen = pd.DataFrame.from_dict(totales, orient='index')
+            resumen['ms_medio'] = (resumen['ms_total'] / resumen['veces']).round(1)
+            st.caption("Acumulado del proceso")
+            st.dataframe(resumen[['veces', 'ms_medio', 'ms_max']], use_container_width=True)
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+import requests
+
+from streamlit.testing.v1 import AppTest
+
+from stub_webhook import iniciar_servidor, url_servidor
+
+# Mide la app de extremo a extremo contra el webhook sintético: búsqueda,
+# deduplicación, estadísticas, gráficos, filtro/orden de artículos, CSV y PDF.
+# Los tiempos por etapa salen del registro de diagnóstico de la propia app
+# (diagnostico.jsonl) y el pico de memoria de tracemalloc en cada paso.
+# Cada tamaño se ejecuta en procesos nuevos (cachés en frío): uno mide
+# tiempos y otro memoria, porque tracemalloc ralentiza mucho la ejecución.
+#
+#   python benchmarks/run_benchmarks.py --guardar-baseline   # fijar la referencia de esta máquina
+#   python benchmarks/run_benchmarks.py                      # comparar con ella
+#
+# La referencia (baseline.json) depende de la máquina y no se versiona.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "app articulos .py")
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# "streamlit run" añade la carpeta del script a sys.path; AppTest no
+sys.path.insert(0, RAIZ)
+
+# Selectboxes con format_func: AppTest (1.31) busca su valor entre las
+# etiquetas ya formateadas, así que antes de cada ejecución se fijan por
+# etiqueta a su opción por defecto (los benchmarks no las cambian)
+SELECTBOX_CON_FORMATO = ["idioma_select", "formato_exportacion"]
+
+def fijar_selectboxes(at):
+    for selectbox in at.selectbox:
+        if selectbox.key in SELECTBOX_CON_FORMATO:
+            selectbox.set_value(selectbox.options[selectbox.proto.default])
+
+def configuracion(directorio, url_webhook):
+    return {
+        "supabase_url": "http://127.0.0.1:9",
+        # Con forma de JWT para que el cliente se cree; nunca llega a conectar
+        "supabase_key": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark",
+        "webhook_url": url_webhook,
+        "webhook_reintentos": 0,
+        "historial_reintentos": 1,
+        "cache_sqlite_path": os.path.join(directorio, "busquedas.sqlite3"),
+        "instantaneas_dir": os.path.join(directorio, "instantaneas"),
+        "exportaciones_dir": os.path.join(directorio, "exportaciones"),
+        "historial_pendientes_path": os.path.join(directorio, "historial_pendientes.jsonl"),
+        "diagnostico_log_path": os.path.join(directorio, "diagnostico.jsonl"),
+    }
+
+class Medidor:
+    def __init__(self, ruta_log):
+        self.ruta_log = ruta_log
+        self._posicion = 0
+
+    # Etapas registradas por la app desde la última lectura, sumadas por nombre
+    def _etapas_nuevas(self):
+        etapas = {}
+        if not os.path.exists(self.ruta_log):
+            return etapas
+        with open(self.ruta_log, encoding="utf-8") as archivo:
+            archivo.seek(self._posicion)
+            for linea in archivo:
+                registro = json.loads(linea)
+                if registro.get("tipo") != "ejecucion":
+                    continue
+                for medida in registro["etapas"]:
+                    etapas[medida["etapa"]] = round(etapas.get(medida["etapa"], 0) + medida["ms"], 1)
+            self._posicion = archivo.tell()
+        return etapas
+
+    def medir(self, accion):
+        self._etapas_nuevas()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memoria_inicial = tracemalloc.get_traced_memory()[0]
+            accion()
+            pico_mb = round((tracemalloc.get_traced_memory()[1] - memoria_inicial) / (1024 * 1024), 2)
+            self._etapas_nuevas()
+            return {"pico_mb": pico_mb}
+        inicio = time.perf_counter()
+        accion()
+        pared_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        return {"pared_ms": pared_ms, "etapas_ms": self._etapas_nuevas()}
+
+def _boton(at, texto):
+    return next(b for b in at.button if texto in b.label)
+
+def _ejecutar(at):
+    fijar_selectboxes(at)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+def medir_tamaño(servidor, directorio, articulos, pdf_max, timeout):
+    servidor.articulos = articulos
+    secretos = configuracion(directorio, url_servidor(servidor))
+    medidor = Medidor(secretos["diagnostico_log_path"])
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.secrets.update(secretos)
+    _ejecutar(at)
+
+    pasos = {}
+    # Tema distinto por tamaño: ninguna caché de búsqueda ni de tabla se reutiliza
+    tema = f"benchmark {articulos}"
+    # Generar antes la respuesta del stub para no medir su propio coste
+    # (mismo rango que los valores por defecto de la barra lateral)
+    requests.post(url_servidor(servidor), json={
+        "tema": tema, "fechaInicio": "2020-01-01", "fechaFin": date.today().isoformat()
+    }).raise_for_status()
+    at.text_input(key="tema_input").input(tema)
+    # Una sola petición de "articulos" registros (sin reparto por años)
+    at.checkbox(key="busqueda_paralela").uncheck()
+
+    def buscar():
+        _boton(at, "Realizar Búsqueda").click()
+        _ejecutar(at)
+    pasos["busqueda"] = medidor.medir(buscar)
+
+    def abrir_articulos():
+        at.radio(key="vista_resultados").set_value("📄 Artículos")
+        _ejecutar(at)
+    pasos["articulos"] = medidor.medir(abrir_articulos)
+
+    def ordenar_por_titulo():
+        next(s for s in at.selectbox if s.label == "Ordenar por:").set_value("Título")
+        _ejecutar(at)
+    pasos["filtro_orden"] = medidor.medir(ordenar_por_titulo)
+
+    def exportar_csv():
+        _boton(at, "Generar CSV").click()
+        _ejecutar(at)
+    pasos["csv"] = medidor.medir(exportar_csv)
+
+    if articulos <= pdf_max:
+        def exportar_pdf():
+            _boton(at, "Generar PDF").click()
+            _ejecutar(at)
+        pasos["pdf"] = medidor.medir(exportar_pdf)
+
+    return pasos
+
+# Un tamaño en un proceso aparte; modo "tiempo" o "memoria"
+def medir_aislado(articulos, modo, args):
+    descriptor, ruta_resultado = tempfile.mkstemp(suffix=".json", prefix="benchmark_")
+    os.close(descriptor)
+    try:
+        subprocess.run([
+            sys.executable, os.path.abspath(__file__),
+            "--medir-tamaño", str(articulos), "--modo", modo, "--resultado", ruta_resultado,
+            "--pdf-max", str(args.pdf_max), "--latencia", str(args.latencia), "--timeout", str(args.timeout)
+        ], check=True)
+        with open(ruta_resultado, encoding="utf-8") as archivo:
+            return json.load(archivo)
+    finally:
+        os.remove(ruta_resultado)
+
+def medir_en_proceso(args):
+    servidor = iniciar_servidor(latencia=args.latencia)
+    if args.modo == "memoria":
+        tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="benchmark_articulos_") as directorio:
+            pasos = medir_tamaño(servidor, directorio, args.medir_tamaño, args.pdf_max, args.timeout)
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        servidor.shutdown()
+    with open(args.resultado, "w", encoding="utf-8") as archivo:
+        json.dump(pasos, archivo)
+
+# Métricas planas "tamaño/paso/métrica" para comparar con la referencia
+def aplanar(resultados):
+    metricas = {}
+    for tamaño, pasos in resultados.items():
+        for paso, medida in pasos.items():
+            metricas[f"{tamaño}/{paso}/pared_ms"] = medida["pared_ms"]
+            metricas[f"{tamaño}/{paso}/pico_mb"] = medida["pico_mb"]
+            for etapa, ms in medida["etapas_ms"].items():
+                if etapa != "ejecucion":
+                    metricas[f"{tamaño}/{paso}/{etapa}_ms"] = ms
+    return metricas
+
+# Una métrica empeora si supera la referencia en más de "tolerancia" (relativa)
+# y además en más de un margen absoluto, para no saltar con el ruido de valores pequeños
+def comparar(metricas, referencia, tolerancia, margen_ms, margen_mb):
+    regresiones = []
+    for nombre, valor in sorted(metricas.items()):
+        base = referencia.get(nombre)
+        if base is None:
+            continue
+        margen = margen_mb if nombre.endswith("_mb") else margen_ms
+        if valor > base * (1 + tolerancia) and valor - base > margen:
+            regresiones.append((nombre, base, valor))
+    return regresiones
+
+def imprimir(metricas, referencia):
+    ancho = max(len(nombre) for nombre in metricas)
+    print(f"{'métrica'.ljust(ancho)}  {'actual':>10}  {'referencia':>10}  {'cambio':>8}")
+    for nombre, valor in sorted(metricas.items()):
+        base = referencia.get(nombre)
+        cambio = f"{(valor - base) / base * 100:+.0f}%" if base else ""
+        base_texto = f"{base:>10.1f}" if base is not None else f"{'-':>10}"
+        print(f"{nombre.ljust(ancho)}  {valor:>10.1f}  {base_texto}  {cambio:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la app contra un webhook sintético")
+    parser.add_argument("--tamaños", default="100,1000,10000",
+                        help="artículos por respuesta del webhook, separados por comas (hasta 50000)")
+    parser.add_argument("--pdf-max", type=int, default=1000, help="tamaño máximo para el que se mide el PDF")
+    parser.add_argument("--latencia", type=float, default=0.0, help="latencia simulada del webhook en segundos")
+    parser.add_argument("--timeout", type=float, default=900, help="segundos máximos por ejecución del script")
+    parser.add_argument("--tolerancia", type=float, default=0.3, help="empeoramiento relativo permitido")
+    parser.add_argument("--margen-ms", type=float, default=50, help="empeoramiento absoluto ignorado (ms)")
+    parser.add_argument("--margen-mb", type=float, default=5, help="empeoramiento absoluto ignorado (MB)")
+    parser.add_argument("--baseline", default=BASELINE, help="archivo JSON de referencia")
+    parser.add_argument("--guardar-baseline", action="store_true", help="guardar estos resultados como referencia")
+    parser.add_argument("--salida", help="guardar los resultados detallados en este JSON")
+    # Uso interno: medir un solo tamaño en este proceso
+    parser.add_argument("--medir-tamaño", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--modo", choices=["tiempo", "memoria"], help=argparse.SUPPRESS)
+    parser.add_argument("--resultado", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir_tamaño:
+        medir_en_proceso(args)
+        return 0
+
+    tamaños = [int(t) for t in args.tamaños.split(",") if t.strip()]
+    resultados = {}
+    for articulos in tamaños:
+        print(f"· {articulos} artículos...", file=sys.stderr)
+        pasos = medir_aislado(articulos, "tiempo", args)
+        for paso, medida in medir_aislado(articulos, "memoria", args).items():
+            pasos[paso].update(medida)
+        resultados[str(articulos)] = pasos
+
+    metricas = aplanar(resultados)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+
+    if args.guardar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as archivo:
+            json.dump(metricas, archivo, indent=2, sort_keys=True, ensure_ascii=False)
+            archivo.write("\n")
+        imprimir(metricas, {})
+        print(f"\nReferencia guardada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        imprimir(metricas, {})
+        print(f"\n(sin referencia en {args.baseline}: ejecuta con --guardar-baseline para fijarla en esta máquina)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as archivo:
+        referencia = json.load(archivo)
+    imprimir(metricas, referencia)
+    regresiones = comparar(metricas, referencia, args.tolerancia, args.margen_ms, args.margen_mb)
+    if regresiones:
+        print("\n❌ Regresiones respecto a la referencia:")
+        for nombre, base, valor in regresiones:
+            print(f"  {nombre}: {base:.1f} → {valor:.1f}")
+        return 1
+    print("\n✅ Sin regresiones respecto a la referencia")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Sustituto local del webhook "busqueda-cientifica" de n8n para medir la app
+# sin red. Devuelve artículos sintéticos con el mismo formato (lista JSON) y
+# longitudes de texto parecidas a las reales.
+
+PALABRAS = (
+    "aprendizaje automático redes neuronales análisis datos modelo estudio "
+    "evaluación sistema método resultados educación salud clima energía "
+    "algoritmo predicción clasificación muestra variables impacto revisión "
+    "encuesta diseño experimento calidad rendimiento social tecnología"
+).split()
+NOMBRES = ["Ana", "Luis", "María", "Carlos", "Lucía", "Jorge", "Elena", "Pedro", "Sofía", "Diego",
+           "John", "Emma", "Wei", "Yuki", "Omar", "Fatima", "Ivan", "Chloe", "Raj", "Nadia"]
+APELLIDOS = ["García", "Rodríguez", "López", "Martínez", "Smith", "Johnson", "Wang", "Tanaka",
+             "Müller", "Rossi", "Silva", "Kumar", "Nguyen", "Kim", "Ahmed", "Novak"]
+VENUES = ["Nature", "Science", "PLOS ONE", "IEEE Access", "Revista de Educación",
+          "Journal of Machine Learning Research", "The Lancet", ""]
+
+def _frase(r, minimo, maximo):
+    return " ".join(r.choice(PALABRAS) for _ in range(r.randint(minimo, maximo)))
+
+# Artículos deterministas para (tema, rango, n). Alrededor de un 10 % son
+# el mismo trabajo devuelto por la otra fuente, como ocurre con CORE y CrossRef.
+def generar_articulos(tema, fecha_inicio, fecha_fin, n, semilla=0):
+    r = random.Random(f"{semilla}|{tema}|{fecha_inicio}|{fecha_fin}|{n}")
+    año_inicio = date.fromisoformat(fecha_inicio).year
+    año_fin = date.fromisoformat(fecha_fin).year
+    articulos = []
+    for i in range(n):
+        if articulos and r.random() < 0.1:
+            duplicado = dict(r.choice(articulos))
+            duplicado['fuente'] = "CrossRef" if duplicado['fuente'] == "CORE" else "CORE"
+            duplicado['url'] = f"https://ejemplo.org/{tema}/{i}"
+            articulos.append(duplicado)
+            continue
+        autores = ", ".join(f"{r.choice(NOMBRES)} {r.choice(APELLIDOS)}" for _ in range(r.randint(1, 12)))
+        articulos.append({
+            "titulo": f"{_frase(r, 6, 16).capitalize()} ({tema})",
+            "autores": autores,
+            "año": str(r.randint(año_inicio, año_fin)),
+            "venue": r.choice(VENUES),
+            "fuente": r.choice(["CORE", "CrossRef"]),
+            "doi": f"10.{r.randint(1000, 9999)}/{r.getrandbits(40):x}" if r.random() < 0.7 else "",
+            "url": f"https://ejemplo.org/{tema}/{i}",
+            "resumen": _frase(r, 120, 320).capitalize() + "." if r.random() < 0.9 else "Resumen no disponible",
+            "palabras_clave": ", ".join(_frase(r, 1, 3) for _ in range(r.randint(3, 8))),
+            "objetivo": _frase(r, 10, 40) if r.random() < 0.6 else "No especificado",
+            "metodologia": _frase(r, 10, 40) if r.random() < 0.5 else "No especificada",
+        })
+    return articulos
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_POST(self):
+        servidor = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        clave = (payload.get("tema", ""), payload.get("fechaInicio"), payload.get("fechaFin"), servidor.articulos)
+        with servidor.lock:
+            servidor.peticiones += 1
+            cuerpo = servidor.respuestas.get(clave)
+        if cuerpo is None:
+            articulos = generar_articulos(clave[0], clave[1], clave[2], servidor.articulos, servidor.semilla)
+            cuerpo = json.dumps(articulos, ensure_ascii=False).encode("utf-8")
+            with servidor.lock:
+                servidor.respuestas[clave] = cuerpo
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+# Servidor en un hilo en segundo plano; "articulos" y "latencia" se pueden
+# cambiar entre mediciones. El puerto 0 elige uno libre.
+def iniciar_servidor(articulos=1000, latencia=0.0, puerto=0, semilla=0):
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), _Manejador)
+    servidor.daemon_threads = True
+    servidor.articulos = articulos
+    servidor.latencia = latencia
+    servidor.semilla = semilla
+    servidor.peticiones = 0
+    servidor.respuestas = {}
+    servidor.lock = threading.Lock()
+    threading.Thread(target=servidor.serve_forever, name="stub-webhook", daemon=True).start()
+    return servidor
+
+def url_servidor(servidor):
+    return f"http://127.0.0.1:{servidor.server_address[1]}/webhook/busqueda-cientifica"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Webhook de búsqueda sintético para pruebas locales")
+    parser.add_argument("--articulos", type=int, default=1000, help="artículos por respuesta")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos de espera por petición")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+    servidor = iniciar_servidor(args.articulos, args.latencia, args.puerto, args.semilla)
+    print(f"Webhook sintético en {url_servidor(servidor)} ({args.articulos} artículos, {args.latencia} s)")
+    print('Configura webhook_url con esa dirección en .streamlit/secrets.toml. Ctrl+C para salir.')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
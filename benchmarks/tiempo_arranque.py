@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Tiempo de arranque en frío de la app: cada repetición es un proceso nuevo
+# que importa Streamlit y ejecuta el script una vez sin resultados (lo que ve
+# quien abre la página). Informa también de qué librerías pesadas quedaron
+# cargadas: ReportLab, Plotly, Supabase y pypdf solo deberían cargarse cuando
+# se usan (PDF, gráficos, historial).
+#
+#   python benchmarks/tiempo_arranque.py
+#   python benchmarks/tiempo_arranque.py --app /otra/copia/app\ articulos\ .py   # comparar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "app articulos .py")
+# Streamlit ya importa plotly.io; lo que pesa es plotly.express
+MODULOS_PESADOS = ["reportlab", "plotly.express", "supabase", "pypdf", "pyarrow.parquet"]
+
+def medir_en_proceso(app):
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    base = time.perf_counter() - inicio
+
+    from run_benchmarks import configuracion, fijar_selectboxes
+    # Delante de RAIZ (que añade run_benchmarks) para medir los módulos de esa copia
+    sys.path.insert(0, os.path.dirname(os.path.abspath(app)))
+    with tempfile.TemporaryDirectory(prefix="arranque_") as directorio:
+        at = AppTest.from_file(app, default_timeout=120)
+        at.secrets.update(configuracion(directorio, "http://127.0.0.1:9/webhook"))
+        inicio = time.perf_counter()
+        at.run()
+        primera = time.perf_counter() - inicio
+        fijar_selectboxes(at)
+        inicio = time.perf_counter()
+        at.run()
+        segunda = time.perf_counter() - inicio
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return {
+        'streamlit_s': round(base, 3),
+        'primera_ejecucion_s': round(primera, 3),
+        'rerun_s': round(segunda, 3),
+        'cargados': [m for m in MODULOS_PESADOS if m in sys.modules],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque en frío de la app")
+    parser.add_argument("--app", default=APP)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir_en_proceso(args.app)))
+        return
+
+    medidas = []
+    for _ in range(args.repeticiones):
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--medir", "--app", args.app],
+            capture_output=True, text=True, check=True
+        ).stdout
+        medidas.append(json.loads(salida.strip().splitlines()[-1]))
+
+    print(f"App: {args.app} ({args.repeticiones} procesos en frío, mediana)")
+    for campo in ['streamlit_s', 'primera_ejecucion_s', 'rerun_s']:
+        print(f"  {campo:<22} {statistics.median(m[campo] for m in medidas):>8.3f}")
+    print(f"  {'cargados al arrancar':<22} {', '.join(medidas[-1]['cargados']) or '(ninguno)'}")
+
+if __name__ == "__main__":
+    main()
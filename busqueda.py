@@ -0,0 +1,700 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import date, timedelta
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# Caché de resultados en dos niveles: memoria del proceso (LRU) + SQLite persistente.
+# La instancia es compartida por todas las sesiones, por eso todo pasa por un lock.
+class CacheBusquedas:
+    def __init__(self, ruta_sqlite, ttl_segundos, max_bytes_memoria, max_bytes_disco):
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes_memoria = max_bytes_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self._memoria = OrderedDict()  # clave -> (expira, tamaño, resultados)
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        
+        directorio = os.path.dirname(ruta_sqlite)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._db = sqlite3.connect(ruta_sqlite, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS cache_busquedas (
+                clave TEXT PRIMARY KEY,
+                datos BLOB NOT NULL,
+                tamaño INTEGER NOT NULL,
+                expira REAL NOT NULL,
+                ultimo_acceso REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_cache_acceso ON cache_busquedas (ultimo_acceso)")
+        self._db.commit()
+    
+    def obtener(self, clave):
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada and entrada[0] > ahora:
+                self._memoria.move_to_end(clave)
+                self.aciertos_memoria += 1
+                return entrada[2]
+            if entrada:
+                self._quitar_de_memoria(clave)
+            
+            fila = self._db.execute(
+                "SELECT datos, expira FROM cache_busquedas WHERE clave = ? AND expira > ?",
+                (clave, ahora)
+            ).fetchone()
+            if fila is None:
+                self.fallos += 1
+                return None
+            
+            self._db.execute("UPDATE cache_busquedas SET ultimo_acceso = ? WHERE clave = ?", (ahora, clave))
+            self._db.commit()
+            datos = zlib.decompress(fila[0])
+            resultados = json.loads(datos)
+            self._guardar_en_memoria(clave, fila[1], len(datos), resultados)
+            self.aciertos_disco += 1
+            return resultados
+    
+    def guardar(self, clave, resultados):
+        ahora = time.time()
+        expira = ahora + self.ttl_segundos
+        datos = json.dumps(resultados, ensure_ascii=False).encode('utf-8')
+        comprimido = zlib.compress(datos, 6)
+        with self._lock:
+            self._guardar_en_memoria(clave, expira, len(datos), resultados)
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_busquedas (clave, datos, tamaño, expira, ultimo_acceso) VALUES (?, ?, ?, ?, ?)",
+                (clave, comprimido, len(comprimido), expira, ahora)
+            )
+            self._evictar_disco(ahora)
+            self._db.commit()
+    
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'aciertos_memoria': self.aciertos_memoria,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'entradas_memoria': len(self._memoria),
+                'bytes_memoria': self._bytes_memoria,
+            }
+    
+    def _guardar_en_memoria(self, clave, expira, tamaño, resultados):
+        if clave in self._memoria:
+            self._quitar_de_memoria(clave)
+        if tamaño > self.max_bytes_memoria:
+            return
+        self._memoria[clave] = (expira, tamaño, resultados)
+        self._bytes_memoria += tamaño
+        while self._bytes_memoria > self.max_bytes_memoria:
+            clave_antigua = next(iter(self._memoria))
+            self._quitar_de_memoria(clave_antigua)
+    
+    def _quitar_de_memoria(self, clave):
+        _, tamaño, _ = self._memoria.pop(clave)
+        self._bytes_memoria -= tamaño
+    
+    def _evictar_disco(self, ahora):
+        self._db.execute("DELETE FROM cache_busquedas WHERE expira <= ?", (ahora,))
+        total = self._db.execute("SELECT COALESCE(SUM(tamaño), 0) FROM cache_busquedas").fetchone()[0]
+        if total <= self.max_bytes_disco:
+            return
+        # Borrar las entradas usadas hace más tiempo hasta volver bajo el límite
+        acumulado = 0
+        for clave, tamaño in self._db.execute(
+            "SELECT clave, tamaño FROM cache_busquedas ORDER BY ultimo_acceso ASC"
+        ).fetchall():
+            if total - acumulado <= self.max_bytes_disco:
+                break
+            self._db.execute("DELETE FROM cache_busquedas WHERE clave = ?", (clave,))
+            acumulado += tamaño
+
+# Las funciones crear_* construyen los recursos a partir de la configuración:
+# config(clave, defecto) lee un parámetro (st.secrets en la app, el TOML en cli.py)
+def crear_cache_busquedas(config):
+    return CacheBusquedas(
+        ruta_sqlite=config("cache_sqlite_path", ".cache/busquedas.sqlite3"),
+        ttl_segundos=int(config("cache_ttl_segundos", 6 * 3600)),
+        max_bytes_memoria=int(config("cache_memoria_mb", 64)) * 1024 * 1024,
+        max_bytes_disco=int(config("cache_disco_mb", 512)) * 1024 * 1024
+    )
+
+# Error lanzado sin tocar la red cuando el circuito del webhook está abierto
+class CircuitoAbiertoError(requests.exceptions.RequestException):
+    pass
+
+# Cliente HTTP compartido para el webhook de n8n: conexiones persistentes,
+# timeouts separados de conexión y lectura, reintentos con backoff exponencial
+# con jitter y un circuit breaker que falla rápido si el servicio está caído.
+class ClienteWebhook:
+    ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, url, timeout_conexion, timeout_lectura, reintentos,
+                 backoff_base, umbral_fallos, enfriamiento, max_conexiones, timeout_tramo=60):
+        self.url = url
+        self.timeout_conexion = timeout_conexion
+        self.timeout_lectura = timeout_lectura
+        # Lectura de cada tramo en la búsqueda paralela (ver consultar_tramo)
+        self.timeout_tramo = timeout_tramo
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self._fallos_consecutivos = 0
+        self._abierto_hasta = 0.0
+        self._lock = threading.Lock()
+        
+        self._sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexiones, max_retries=0)
+        self._sesion.mount("https://", adaptador)
+        self._sesion.mount("http://", adaptador)
+    
+    # La búsqueda es de solo lectura, así que repetir el POST es seguro
+    # "metricas" (opcional) recibe el tamaño de la respuesta y los intentos
+    def post_json(self, payload, timeout_lectura=None, metricas=None):
+        self._comprobar_circuito()
+        timeout = (self.timeout_conexion, timeout_lectura or self.timeout_lectura)
+        for intento in range(self.reintentos + 1):
+            try:
+                response = self._sesion.post(self.url, json=payload, timeout=timeout)
+            except requests.exceptions.ConnectionError as e:
+                error = e
+            except requests.exceptions.Timeout:
+                # Un timeout de lectura no se reintenta aquí: repetirlo solo
+                # duplicaría la espera. Quien llama decide si parte el rango.
+                self._registrar_fallo()
+                raise
+            else:
+                if response.status_code not in self.ESTADOS_REINTENTABLES:
+                    self._registrar_exito()
+                    if metricas is not None:
+                        metricas['bytes'] = len(response.content)
+                        metricas['intentos'] = intento + 1
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.exceptions.HTTPError(
+                    f"{response.status_code} Error del servidor de búsqueda", response=response
+                )
+            if intento < self.reintentos:
+                time.sleep(random.uniform(0, self.backoff_base * 2 ** intento))
+        self._registrar_fallo()
+        raise error
+    
+    def circuito_abierto(self):
+        with self._lock:
+            return self._fallos_consecutivos >= self.umbral_fallos and time.monotonic() < self._abierto_hasta
+    
+    def _comprobar_circuito(self):
+        with self._lock:
+            if self._fallos_consecutivos < self.umbral_fallos:
+                return
+            ahora = time.monotonic()
+            if ahora < self._abierto_hasta:
+                raise CircuitoAbiertoError(
+                    f"El servicio de búsqueda no responde; se volverá a intentar en {int(self._abierto_hasta - ahora) + 1} s"
+                )
+            # Semiabierto: dejar pasar una sola llamada de prueba
+            self._abierto_hasta = ahora + self.enfriamiento
+    
+    def _registrar_exito(self):
+        with self._lock:
+            self._fallos_consecutivos = 0
+    
+    def _registrar_fallo(self):
+        with self._lock:
+            self._fallos_consecutivos += 1
+            if self._fallos_consecutivos >= self.umbral_fallos:
+                self._abierto_hasta = time.monotonic() + self.enfriamiento
+
+def crear_cliente_webhook(config):
+    return ClienteWebhook(
+        url=config("webhook_url", "https://eriks20252.app.n8n.cloud/webhook/busqueda-cientifica"),
+        timeout_conexion=float(config("webhook_timeout_conexion", 5)),
+        timeout_lectura=float(config("webhook_timeout_lectura", 120)),
+        reintentos=int(config("webhook_reintentos", 2)),
+        backoff_base=float(config("webhook_backoff_base", 1.0)),
+        umbral_fallos=int(config("webhook_umbral_fallos", 5)),
+        enfriamiento=float(config("webhook_enfriamiento", 30)),
+        max_conexiones=int(config("busqueda_max_hilos", 8)),
+        timeout_tramo=float(config("webhook_timeout_tramo", 60))
+    )
+
+# Pool acotado para las consultas en paralelo al webhook
+def crear_pool_busquedas(config):
+    return ThreadPoolExecutor(
+        max_workers=int(config("busqueda_max_hilos", 8)),
+        thread_name_prefix="busqueda"
+    )
+
+# Coalescencia de búsquedas idénticas en curso (single-flight): la primera
+# sesión hace la llamada y las demás esperan el mismo Future.
+class SingleFlight:
+    def __init__(self):
+        self._en_curso = {}
+        self._lock = threading.Lock()
+    
+    def ejecutar(self, clave, funcion, al_unirse=None):
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._en_curso[clave] = futuro
+        
+        if not lider:
+            if al_unirse:
+                al_unirse()
+            return futuro.result()
+        
+        try:
+            resultado = funcion()
+            futuro.set_result(resultado)
+            return resultado
+        except Exception as e:
+            futuro.set_exception(e)
+            raise
+        except BaseException:
+            # Streamlit detiene el script del líder con excepciones de control
+            # (rerun/stop); las demás sesiones no deben recibirlas.
+            futuro.set_exception(
+                requests.exceptions.RequestException("La búsqueda compartida se canceló antes de terminar")
+            )
+            raise
+        finally:
+            with self._lock:
+                self._en_curso.pop(clave, None)
+
+# Función para calcular un hash estable del contenido (resultados, tema, estadísticas...)
+def calcular_hash_contenido(*partes):
+    contenido = json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+# Tema e idioma normalizados (minúsculas, espacios, orden de idiomas)
+def normalizar_consulta(tema, idioma):
+    tema_normalizado = " ".join(tema.lower().split())
+    idioma_normalizado = ",".join(sorted(i.strip() for i in idioma.split(",")))
+    return tema_normalizado, idioma_normalizado
+
+# Clave normalizada de una búsqueda: (tema, fechaInicio, fechaFin, idioma)
+def clave_busqueda(tema, fecha_inicio, fecha_fin, idioma):
+    tema_normalizado, idioma_normalizado = normalizar_consulta(tema, idioma)
+    return calcular_hash_contenido(
+        tema_normalizado,
+        fecha_inicio.strftime("%Y-%m-%d"),
+        fecha_fin.strftime("%Y-%m-%d"),
+        idioma_normalizado
+    )
+
+# Instantáneas comprimidas (gzip JSON) de los resultados de cada búsqueda,
+# guardadas por clave de consulta para poder reabrirlas desde el historial.
+# Un índice SQLite lleva tamaño y último acceso para expulsar las más viejas.
+class AlmacenInstantaneas:
+    def __init__(self, directorio, max_bytes_instantanea, max_bytes_total):
+        self.directorio = directorio
+        self.max_bytes_instantanea = max_bytes_instantanea
+        self.max_bytes_total = max_bytes_total
+        self._lock = threading.Lock()
+        self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="instantaneas")
+        
+        os.makedirs(directorio, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directorio, "indice.sqlite3"), timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS instantaneas (
+                clave TEXT PRIMARY KEY,
+                tema TEXT NOT NULL,
+                idioma TEXT NOT NULL,
+                fecha_inicio TEXT NOT NULL,
+                fecha_fin TEXT NOT NULL,
+                tamaño INTEGER NOT NULL,
+                creado REAL NOT NULL,
+                ultimo_acceso REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_instantaneas_tema ON instantaneas (tema, idioma)")
+        self._db.commit()
+    
+    # Comprimir y escribir fuera del hilo del script
+    def guardar_en_segundo_plano(self, tema, fecha_inicio, fecha_fin, idioma, resultados):
+        return self._escritor.submit(self.guardar, tema, fecha_inicio, fecha_fin, idioma, resultados)
+    
+    def guardar(self, tema, fecha_inicio, fecha_fin, idioma, resultados):
+        clave = clave_busqueda(tema, fecha_inicio, fecha_fin, idioma)
+        datos = gzip.compress(json.dumps(resultados, ensure_ascii=False).encode('utf-8'), compresslevel=6)
+        if len(datos) > self.max_bytes_instantanea:
+            return False
+        
+        ruta = self._ruta(clave)
+        with open(ruta + ".tmp", "wb") as archivo:
+            archivo.write(datos)
+        os.replace(ruta + ".tmp", ruta)
+        
+        tema_normalizado, idioma_normalizado = normalizar_consulta(tema, idioma)
+        ahora = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO instantaneas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (clave, tema_normalizado, idioma_normalizado, fecha_inicio.strftime("%Y-%m-%d"),
+                 fecha_fin.strftime("%Y-%m-%d"), len(datos), ahora, ahora)
+            )
+            self._evictar()
+            self._db.commit()
+        return True
+    
+    def cargar(self, clave):
+        try:
+            with gzip.open(self._ruta(clave), "rb") as archivo:
+                resultados = json.load(archivo)
+        except FileNotFoundError:
+            with self._lock:
+                self._db.execute("DELETE FROM instantaneas WHERE clave = ?", (clave,))
+                self._db.commit()
+            return None
+        with self._lock:
+            self._db.execute("UPDATE instantaneas SET ultimo_acceso = ? WHERE clave = ?", (time.time(), clave))
+            self._db.commit()
+        return resultados
+    
+    # Instantánea más amplia del mismo tema e idioma contenida en la ventana
+    # pedida (sin ser exactamente la misma); None si no hay ninguna
+    def buscar_cobertura(self, tema, idioma, fecha_inicio, fecha_fin):
+        tema_normalizado, idioma_normalizado = normalizar_consulta(tema, idioma)
+        inicio, fin = fecha_inicio.strftime("%Y-%m-%d"), fecha_fin.strftime("%Y-%m-%d")
+        with self._lock:
+            fila = self._db.execute(
+                """
+                SELECT clave, fecha_inicio, fecha_fin FROM instantaneas
+                WHERE tema = ? AND idioma = ? AND fecha_inicio >= ? AND fecha_fin <= ?
+                  AND NOT (fecha_inicio = ? AND fecha_fin = ?)
+                ORDER BY julianday(fecha_fin) - julianday(fecha_inicio) DESC, creado DESC
+                LIMIT 1
+                """,
+                (tema_normalizado, idioma_normalizado, inicio, fin, inicio, fin)
+            ).fetchone()
+        if fila is None:
+            return None
+        return fila[0], date.fromisoformat(fila[1]), date.fromisoformat(fila[2])
+    
+    # Subconjunto de claves que tienen instantánea guardada
+    def disponibles(self, claves):
+        claves = list(claves)
+        if not claves:
+            return set()
+        marcadores = ",".join("?" * len(claves))
+        with self._lock:
+            filas = self._db.execute(f"SELECT clave FROM instantaneas WHERE clave IN ({marcadores})", claves).fetchall()
+        return {fila[0] for fila in filas}
+    
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.json.gz")
+    
+    def _evictar(self):
+        total = self._db.execute("SELECT COALESCE(SUM(tamaño), 0) FROM instantaneas").fetchone()[0]
+        for clave, tamaño in self._db.execute(
+            "SELECT clave, tamaño FROM instantaneas ORDER BY ultimo_acceso ASC"
+        ).fetchall():
+            if total <= self.max_bytes_total:
+                break
+            self._db.execute("DELETE FROM instantaneas WHERE clave = ?", (clave,))
+            try:
+                os.remove(self._ruta(clave))
+            except FileNotFoundError:
+                pass
+            total -= tamaño
+
+def crear_almacen_instantaneas(config):
+    return AlmacenInstantaneas(
+        directorio=config("instantaneas_dir", ".cache/instantaneas"),
+        max_bytes_instantanea=int(config("instantanea_max_mb", 20)) * 1024 * 1024,
+        max_bytes_total=int(config("instantaneas_total_mb", 1024)) * 1024 * 1024
+    )
+
+# Consultar el webhook para un rango de fechas. Se ejecuta también desde los
+# hilos del pool; con "traza" la llamada queda medida como etapa "webhook".
+def consultar_webhook(cliente, tema, fecha_inicio, fecha_fin, idioma, timeout=None, traza=None):
+    payload = {
+        "tema": tema,
+        "fechaInicio": fecha_inicio.strftime("%Y-%m-%d"),
+        "fechaFin": fecha_fin.strftime("%Y-%m-%d"),
+        "idioma": idioma
+    }
+    medicion = traza.medir("webhook", desde=payload["fechaInicio"], hasta=payload["fechaFin"]) if traza else nullcontext({})
+    with medicion as datos:
+        return cliente.post_json(payload, timeout_lectura=timeout, metricas=datos)
+
+# Dividir [fecha_inicio, fecha_fin] en tramos por año calendario
+def dividir_rango_fechas(fecha_inicio, fecha_fin):
+    tramos = []
+    inicio = fecha_inicio
+    while inicio <= fecha_fin:
+        fin = min(date(inicio.year, 12, 31), fecha_fin)
+        tramos.append((inicio, fin))
+        inicio = fin + timedelta(days=1)
+    return tramos
+
+# Consultar un tramo por separado (el cliente ya reintenta errores de conexión
+# y 5xx); si agota cliente.timeout_tramo y es suficientemente largo, se parte
+# en dos mitades que se consultan por separado
+def consultar_tramo(cliente, tema, fecha_inicio, fecha_fin, idioma, traza=None):
+    try:
+        return consultar_webhook(cliente, tema, fecha_inicio, fecha_fin, idioma, timeout=cliente.timeout_tramo, traza=traza) or []
+    except CircuitoAbiertoError:
+        raise
+    except requests.exceptions.Timeout:
+        dias = (fecha_fin - fecha_inicio).days
+        if dias < 60:
+            raise
+        mitad = fecha_inicio + timedelta(days=dias // 2)
+        return (consultar_tramo(cliente, tema, fecha_inicio, mitad, idioma, traza)
+                + consultar_tramo(cliente, tema, mitad + timedelta(days=1), fecha_fin, idioma, traza))
+
+# Sub-rangos de [fecha_inicio, fecha_fin] que quedan fuera de lo ya cubierto
+def rangos_faltantes(fecha_inicio, fecha_fin, cubierto_inicio, cubierto_fin):
+    faltantes = []
+    if fecha_inicio < cubierto_inicio:
+        faltantes.append((fecha_inicio, cubierto_inicio - timedelta(days=1)))
+    if cubierto_fin < fecha_fin:
+        faltantes.append((cubierto_fin + timedelta(days=1), fecha_fin))
+    return faltantes
+
+# Repartir la búsqueda por años en el pool de hilos y unir las listas parciales.
+# al_recibir(parciales, completados, total) se llama en el hilo del script
+# cada vez que termina un tramo, para poder pintar resultados parciales.
+# Con "tramos" se consultan solo esos rangos en lugar de dividir la ventana.
+def buscar_en_paralelo(cliente, pool, tema, fecha_inicio, fecha_fin, idioma, al_recibir=None, tramos=None, traza=None):
+    if tramos is None:
+        tramos = dividir_rango_fechas(fecha_inicio, fecha_fin)
+    # Los años más recientes primero: suelen ser los que más interesan
+    futuros = {
+        pool.submit(consultar_tramo, cliente, tema, inicio, fin, idioma, traza): (inicio, fin)
+        for inicio, fin in reversed(tramos)
+    }
+    resultados = []
+    fallidos = []
+    for completados, futuro in enumerate(as_completed(futuros), 1):
+        try:
+            resultados.extend(futuro.result())
+        except requests.exceptions.RequestException:
+            fallidos.append(futuros[futuro])
+        if al_recibir and resultados:
+            al_recibir(resultados, completados, len(futuros))
+    return resultados, sorted(fallidos)
+
+# Limitador de tasa compartido entre hilos: cada llamada a esperar() reserva
+# el siguiente turno, separados 1/por_segundo segundos (sin límite si es 0)
+class LimitadorTasa:
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo > 0 else 0.0
+        self._siguiente = 0.0
+        self._lock = threading.Lock()
+    
+    def esperar(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            self._siguiente = turno + self.intervalo
+        time.sleep(turno - ahora)
+
+# Cliente del webhook que pasa por un LimitadorTasa antes de cada petición,
+# para que una búsqueda por lotes no sature el servicio
+class ClienteLimitado:
+    def __init__(self, cliente, limitador):
+        self._cliente = cliente
+        self._limitador = limitador
+        self.timeout_tramo = cliente.timeout_tramo
+    
+    def post_json(self, payload, **opciones):
+        self._limitador.esperar()
+        return self._cliente.post_json(payload, **opciones)
+    
+    def circuito_abierto(self):
+        return self._cliente.circuito_abierto()
+
+# Búsqueda completa de un tema sin interfaz: caché compartida, coalescencia
+# de búsquedas idénticas y consulta por tramos anuales en el pool.
+# Devuelve (resultados, fallidos, desde_cache).
+def buscar_tema(cliente, pool, cache, en_curso, tema, fecha_inicio, fecha_fin, idioma, traza=None):
+    clave = clave_busqueda(tema, fecha_inicio, fecha_fin, idioma)
+    en_cache = cache.obtener(clave)
+    if en_cache is not None:
+        return en_cache, [], True
+    
+    def buscar():
+        resultados, fallidos = buscar_en_paralelo(cliente, pool, tema, fecha_inicio, fecha_fin, idioma, traza=traza)
+        if resultados and not fallidos:
+            cache.guardar(clave, resultados)
+        return resultados, fallidos
+    resultados, fallidos = en_curso.ejecutar(clave, buscar)
+    return resultados, fallidos, False
+
+# Un tema en el que ningún tramo respondió es un fallo del servicio, no una
+# búsqueda sin resultados: no se guarda en el historial
+def sin_respuesta(resultados, fallidos):
+    return bool(fallidos) and not resultados
+
+# Lista de temas a partir de un texto con uno por línea: sin vacíos ni
+# repetidos (comparados ya normalizados), en el orden en que aparecen
+def leer_temas(texto):
+    temas = []
+    vistos = set()
+    for linea in texto.splitlines():
+        tema = " ".join(linea.split())
+        clave = tema.lower()
+        if tema and clave not in vistos:
+            vistos.add(clave)
+            temas.append(tema)
+    return temas
+
+# Buscar varios temas con como máximo "concurrencia" en curso a la vez, en
+# un pool propio (los tramos de cada tema van al pool de búsquedas).
+# al_terminar(tema, resultado, error) se llama en el hilo que llama según
+# acaba cada tema. Devuelve {tema: (resultado, error)} en el orden de "temas".
+# Cualquier excepción de un tema (red, exportación, disco...) queda como su
+# error y el lote sigue: los temas ya terminados no se pierden.
+def buscar_lote(temas, buscar, concurrencia, al_terminar=None):
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrencia), thread_name_prefix="lote")
+    terminados = {}
+    try:
+        futuros = {pool.submit(buscar, tema): tema for tema in temas}
+        for futuro in as_completed(futuros):
+            tema = futuros[futuro]
+            try:
+                terminados[tema] = (futuro.result(), None)
+            except Exception as e:
+                terminados[tema] = (None, e)
+            if al_terminar:
+                al_terminar(tema, *terminados[tema])
+    finally:
+        # Si el script se detiene a mitad, los temas pendientes no se lanzan
+        pool.shutdown(wait=False, cancel_futures=True)
+    return {tema: terminados[tema] for tema in temas}
+
+# Valores de relleno que devuelve el webhook cuando falta un campo
+VALORES_VACIOS = {"", "N/A", "No especificado", "No especificada", "Resumen no disponible", "No registradas"}
+CAMPOS_FUSIONABLES = ["titulo", "autores", "año", "venue", "doi", "url", "resumen",
+                      "palabras_clave", "objetivo", "metodologia"]
+
+# Parámetros de MinHash/LSH: 32 permutaciones en 8 bandas de 4 filas
+# (candidatos a partir de ~0.6 de similitud) y confirmación con Jaccard >= 0.8
+MINHASH_PRIMO = (1 << 31) - 1
+_rng_minhash = np.random.default_rng(20240501)
+MINHASH_A = _rng_minhash.integers(1, MINHASH_PRIMO, size=32, dtype=np.int64)
+MINHASH_B = _rng_minhash.integers(0, MINHASH_PRIMO, size=32, dtype=np.int64)
+LSH_BANDAS = 8
+UMBRAL_JACCARD = 0.8
+
+def normalizar_texto(texto):
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii').lower()
+    return re.sub(r'[^a-z0-9]+', ' ', texto).strip()
+
+def normalizar_doi(doi):
+    doi = str(doi or '').strip().lower()
+    doi = re.sub(r'^(https?://)?(dx\.)?doi\.org/', '', doi)
+    doi = doi.removeprefix('doi:').strip()
+    return doi if doi.startswith('10.') else ''
+
+def _valor_util(valor):
+    return valor is not None and str(valor).strip() not in VALORES_VACIOS
+
+def _shingles_titulo(titulo_normalizado, k=4):
+    compacto = titulo_normalizado.replace(' ', '')
+    if len(compacto) <= k:
+        return {compacto} if compacto else set()
+    return {compacto[i:i + k] for i in range(len(compacto) - k + 1)}
+
+def _bandas_minhash(shingles):
+    hashes = np.array([zlib.crc32(sh.encode('utf-8')) for sh in shingles], dtype=np.int64) % MINHASH_PRIMO
+    firma = ((MINHASH_A[:, None] * hashes[None, :] + MINHASH_B[:, None]) % MINHASH_PRIMO).min(axis=1)
+    filas = len(firma) // LSH_BANDAS
+    return [(banda, firma[banda * filas:(banda + 1) * filas].tobytes()) for banda in range(LSH_BANDAS)]
+
+# Fusionar en "base" los campos más completos de "duplicado"
+def _fusionar_articulo(base, duplicado):
+    for campo in CAMPOS_FUSIONABLES:
+        nuevo = duplicado.get(campo)
+        if not _valor_util(nuevo):
+            continue
+        actual = base.get(campo)
+        if not _valor_util(actual) or (campo not in ("titulo", "año", "doi", "url") and len(str(nuevo)) > len(str(actual))):
+            base[campo] = nuevo
+
+# Deduplicar artículos de CORE y CrossRef: DOI normalizado exacto, luego
+# título normalizado + año exacto y por último casi-duplicados con MinHash/LSH
+# dentro del mismo año. Devuelve (articulos_unicos, cantidad_colapsada).
+def deduplicar_articulos(resultados):
+    unicos = []
+    copiados = set()
+    doi_unicos = []
+    por_doi = {}
+    por_titulo = {}
+    por_banda = {}
+    shingles_unicos = []
+    
+    for art in resultados:
+        doi = normalizar_doi(art.get('doi'))
+        titulo = normalizar_texto(art.get('titulo', ''))
+        año = str(art.get('año', '')).strip()
+        clave_titulo = (titulo, año) if titulo else None
+        shingles = _shingles_titulo(titulo)
+        bandas = [(año,) + banda for banda in _bandas_minhash(shingles)] if shingles else []
+        
+        destino = por_doi.get(doi) if doi else None
+        if destino is None and clave_titulo in por_titulo:
+            candidato = por_titulo[clave_titulo]
+            if not (doi and doi_unicos[candidato] and doi_unicos[candidato] != doi):
+                destino = candidato
+        if destino is None:
+            candidatos = {c for banda in bandas for c in por_banda.get(banda, ())}
+            for candidato in sorted(candidatos):
+                if doi and doi_unicos[candidato] and doi_unicos[candidato] != doi:
+                    continue
+                otros = shingles_unicos[candidato]
+                if len(shingles & otros) / len(shingles | otros) >= UMBRAL_JACCARD:
+                    destino = candidato
+                    break
+        
+        if destino is None:
+            destino = len(unicos)
+            unicos.append(art)
+            doi_unicos.append(doi)
+            shingles_unicos.append(shingles)
+        else:
+            # Copiar antes de fusionar: la lista original puede venir de la caché compartida
+            if destino not in copiados:
+                unicos[destino] = dict(unicos[destino])
+                copiados.add(destino)
+            _fusionar_articulo(unicos[destino], art)
+            if doi and not doi_unicos[destino]:
+                doi_unicos[destino] = doi
+        
+        if doi:
+            por_doi.setdefault(doi, destino)
+        if clave_titulo:
+            por_titulo.setdefault(clave_titulo, destino)
+        for banda in bandas:
+            por_banda.setdefault(banda, []).append(destino)
+    
+    return unicos, len(resultados) - len(unicos)
@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tomllib
+from datetime import date
+
+import requests
+
+from busqueda import (ClienteLimitado, LimitadorTasa, SingleFlight, buscar_lote, buscar_tema, calcular_hash_contenido,
+                      crear_almacen_instantaneas, crear_cache_busquedas, crear_cliente_webhook, crear_pool_busquedas,
+                      deduplicar_articulos, leer_temas, normalizar_texto, sin_respuesta)
+from diagnostico import Traza, crear_registro_diagnostico
+from estadisticas import calcular_estadisticas, construir_tabla_resultados
+from exportacion import FORMATOS_EXPORTACION, crear_pdf, crear_pool_pdf
+from historial import crear_cliente, error_permanente, fila_busqueda, volcar_pendientes
+
+# Búsqueda por lotes sin interfaz, para cron o workers sin Streamlit: el
+# mismo flujo que el botón "Buscar lote" de la app (webhook, caché,
+# deduplicación, estadísticas y exportaciones) con la misma configuración.
+# Los artículos salen como JSON Lines (uno por línea, con su "tema").
+#
+#   python cli.py "aprendizaje automático" "cambio climático" > articulos.jsonl
+#   python cli.py --temas-archivo temas.txt --salida resultados/ --formatos csv,pdf --resumen resumen.jsonl
+
+# El mismo archivo que lee la app (st.secrets)
+CONFIG_POR_DEFECTO = os.path.join(".streamlit", "secrets.toml")
+FORMATOS = list(FORMATOS_EXPORTACION) + ["pdf"]
+
+# Parámetros de configuración desde un TOML; config(clave, defecto) como obtener_config en la app
+def leer_configuracion(ruta):
+    try:
+        with open(ruta, "rb") as archivo:
+            valores = tomllib.load(archivo)
+    except FileNotFoundError:
+        if ruta != CONFIG_POR_DEFECTO:
+            raise
+        valores = {}
+    return lambda clave, defecto: valores.get(clave, defecto)
+
+# Nombre de archivo para un tema; el hash evita choques entre temas parecidos
+def nombre_archivo(tema):
+    base = normalizar_texto(tema).replace(" ", "-")[:60]
+    return f"{base}-{calcular_hash_contenido(tema)[:8]}" if base else calcular_hash_contenido(tema)[:16]
+
+# Escribir un archivo de una vez: primero a un temporal y luego se renombra,
+# para que un cron que lea la carpeta nunca vea uno a medias
+def escribir_archivo(ruta, generar, binario=True):
+    temporal = f"{ruta}.tmp"
+    try:
+        with open(temporal, "wb") if binario else open(temporal, "w", encoding="utf-8") as archivo:
+            generar(archivo)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return ruta
+
+def escribir_jsonl(articulos, tema, salida):
+    for art in articulos:
+        salida.write(json.dumps({**art, 'tema': tema}, ensure_ascii=False, default=str) + "\n")
+
+# Texto del error de un tema para el resumen; los que no son de red llevan
+# el tipo, porque su mensaje solo no basta (p. ej. KeyError: 'titulo')
+def describir_error(error):
+    if isinstance(error, requests.exceptions.RequestException):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+# Exportaciones de un tema en "directorio"; devuelve {formato: ruta}.
+# Como en la app, los PDF de al menos "umbral_procesos" artículos se
+# renderizan por secciones en "pool_pdf" (procesos, sin el GIL).
+def exportar_tema(articulos, tema, directorio, formatos, traza, pool_pdf=None, umbral_procesos=0):
+    tabla = construir_tabla_resultados(articulos)
+    with traza.medir("estadisticas", articulos=len(tabla)):
+        stats, df, _ = calcular_estadisticas(tabla)
+    ejecutor = pool_pdf if len(tabla) >= umbral_procesos else None
+    rutas = {}
+    nombre = os.path.join(directorio, nombre_archivo(tema))
+    for formato in formatos:
+        with traza.medir("exportacion", formato=formato, articulos=len(tabla)):
+            if formato == "pdf":
+                generar = lambda archivo: crear_pdf(tabla, tema, stats, salida=archivo, ejecutor=ejecutor)
+            else:
+                exportar = FORMATOS_EXPORTACION[formato][2]
+                generar = lambda archivo: exportar(df, archivo)
+            rutas[formato] = escribir_archivo(f"{nombre}.{formato}", generar)
+    return rutas
+
+# Guardar las búsquedas del lote en Supabase en una sola inserción. Si no
+# responde, las filas quedan en el archivo de pendientes que reenvía la app;
+# si las rechaza (historial.error_permanente), se prueban de una en una y se
+# descartan solo las rechazadas. Devuelve (volcadas, rechazadas).
+def guardar_historial(config, filas, cliente=None):
+    try:
+        cliente = cliente or crear_cliente(config("supabase_url", None), config("supabase_key", None))
+        cliente.table("busquedas").insert(filas).execute()
+        return 0, []
+    except Exception as e:
+        if not error_permanente(e):
+            volcar_pendientes(config("historial_pendientes_path", ".cache/historial_pendientes.jsonl"), filas)
+            return len(filas), []
+        if len(filas) == 1:
+            return 0, [(filas[0], e)]
+    volcadas, rechazadas = 0, []
+    for fila in filas:
+        v, r = guardar_historial(config, [fila], cliente)
+        volcadas += v
+        rechazadas += r
+    return volcadas, rechazadas
+
+def leer_argumentos(argumentos=None):
+    parser = argparse.ArgumentParser(description="Búsqueda de artículos por lotes sin interfaz")
+    parser.add_argument("temas", nargs="*", help="temas a buscar (además de los de --temas-archivo)")
+    parser.add_argument("--temas-archivo", help="archivo con un tema por línea ('-' para la entrada estándar)")
+    parser.add_argument("--desde", type=date.fromisoformat, default=date(2020, 1, 1), help="AAAA-MM-DD")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=date.today(), help="AAAA-MM-DD")
+    parser.add_argument("--idioma", choices=["es,en", "es", "en"], default="es,en")
+    parser.add_argument("--config", default=CONFIG_POR_DEFECTO, help="TOML con la configuración de la app")
+    parser.add_argument("--concurrencia", type=int, help="temas a la vez (por defecto lote_concurrencia)")
+    parser.add_argument("--peticiones-por-segundo", type=float,
+                        help="límite de peticiones al webhook, 0 sin límite (por defecto lote_peticiones_por_segundo)")
+    parser.add_argument("--salida", help="carpeta para un .jsonl por tema y las exportaciones (si no, JSONL por stdout)")
+    parser.add_argument("--formatos", default="", help=f"exportaciones por tema con --salida: {','.join(FORMATOS)}")
+    parser.add_argument("--resumen", help="archivo JSONL con una línea de resumen por tema")
+    parser.add_argument("--historial", action="store_true", help="guardar las búsquedas en el historial de Supabase")
+    parser.add_argument("--silencioso", action="store_true", help="sin progreso por stderr")
+    args = parser.parse_args(argumentos)
+
+    args.formatos = [f.strip() for f in args.formatos.split(",") if f.strip()]
+    desconocidos = [f for f in args.formatos if f not in FORMATOS]
+    if desconocidos:
+        parser.error(f"formatos desconocidos: {', '.join(desconocidos)}")
+    if args.formatos and not args.salida:
+        parser.error("--formatos requiere --salida")
+    if args.desde > args.hasta:
+        parser.error("--desde es posterior a --hasta")
+
+    texto = "\n".join(args.temas)
+    if args.temas_archivo == "-":
+        texto += "\n" + sys.stdin.read()
+    elif args.temas_archivo:
+        with open(args.temas_archivo, encoding="utf-8-sig") as archivo:
+            texto += "\n" + archivo.read()
+    args.temas = leer_temas(texto)
+    if not args.temas:
+        parser.error("no hay temas que buscar")
+    return args
+
+def main(argumentos=None):
+    args = leer_argumentos(argumentos)
+    try:
+        config = leer_configuracion(args.config)
+    except FileNotFoundError:
+        print(f"No existe el archivo de configuración {args.config}", file=sys.stderr)
+        return 2
+
+    traza = Traza()
+    registro = crear_registro_diagnostico(config)
+    cache = crear_cache_busquedas(config)
+    almacen = crear_almacen_instantaneas(config)
+    pool = crear_pool_busquedas(config)
+    pool_pdf = crear_pool_pdf(config) if "pdf" in args.formatos else None
+    umbral_pdf = int(config("pdf_umbral_procesos", 1500))
+    en_curso = SingleFlight()
+    concurrencia = args.concurrencia or int(config("lote_concurrencia", 4))
+    por_segundo = args.peticiones_por_segundo
+    if por_segundo is None:
+        por_segundo = float(config("lote_peticiones_por_segundo", 2.0))
+    cliente = ClienteLimitado(crear_cliente_webhook(config), LimitadorTasa(por_segundo))
+    if args.salida:
+        os.makedirs(args.salida, exist_ok=True)
+
+    # Se ejecuta en los hilos del lote, como en la app
+    def buscar(tema):
+        inicio = time.perf_counter()
+        resultados, fallidos, desde_cache = buscar_tema(cliente, pool, cache, en_curso, tema,
+                                                        args.desde, args.hasta, args.idioma, traza=traza)
+        articulos, duplicados = deduplicar_articulos(resultados or [])
+        if articulos and not fallidos:
+            almacen.guardar(tema, args.desde, args.hasta, args.idioma, articulos)
+        exportaciones = {}
+        if args.salida:
+            ruta = os.path.join(args.salida, nombre_archivo(tema) + ".jsonl")
+            exportaciones['jsonl'] = escribir_archivo(
+                ruta, lambda archivo: escribir_jsonl(articulos, tema, archivo), binario=False)
+            if articulos and args.formatos:
+                exportaciones.update(exportar_tema(articulos, tema, args.salida, args.formatos, traza,
+                                                   pool_pdf, umbral_pdf))
+        return {'articulos': articulos, 'duplicados': duplicados, 'fallidos': fallidos, 'cache': desde_cache,
+                'exportaciones': exportaciones, 'segundos': round(time.perf_counter() - inicio, 1)}
+
+    resumen = []
+
+    # En el hilo principal según acaba cada tema: stdout y progreso no se mezclan
+    def al_terminar(tema, resultado, error):
+        linea = {'tema': tema, 'error': describir_error(error) if error is not None else None}
+        if resultado is not None:
+            if not args.salida:
+                escribir_jsonl(resultado['articulos'], tema, sys.stdout)
+                sys.stdout.flush()
+            linea.update(articulos=len(resultado['articulos']), duplicados=resultado['duplicados'],
+                         tramos_sin_respuesta=len(resultado['fallidos']), cache=resultado['cache'],
+                         segundos=resultado['segundos'], exportaciones=resultado['exportaciones'])
+            if sin_respuesta(resultado['articulos'], resultado['fallidos']):
+                linea['error'] = "ningún tramo respondió"
+        resumen.append(linea)
+        if not args.silencioso:
+            if linea['error'] is not None:
+                estado = f"error: {linea['error']}"
+            else:
+                estado = f"{linea['articulos']} artículos" + (" (caché)" if linea['cache'] else "")
+                if linea['tramos_sin_respuesta']:
+                    estado += f", sin respuesta en {linea['tramos_sin_respuesta']} tramos"
+            print(f"[{len(resumen)}/{len(args.temas)}] {tema}: {estado}", file=sys.stderr, flush=True)
+
+    try:
+        with traza.medir("lote", temas=len(args.temas), concurrencia=concurrencia):
+            por_tema = buscar_lote(args.temas, buscar, concurrencia, al_terminar)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if pool_pdf:
+            pool_pdf.shutdown(cancel_futures=True)
+
+    if args.resumen:
+        orden = {tema: i for i, tema in enumerate(args.temas)}
+        resumen.sort(key=lambda linea: orden[linea['tema']])
+        escribir_archivo(args.resumen, lambda archivo: archivo.writelines(
+            json.dumps(linea, ensure_ascii=False) + "\n" for linea in resumen), binario=False)
+
+    if args.historial:
+        filas = [fila_busqueda(tema, args.desde, args.hasta, args.idioma, len(resultado['articulos']))
+                 for tema, (resultado, _) in por_tema.items()
+                 if resultado is not None and not sin_respuesta(resultado['articulos'], resultado['fallidos'])]
+        volcadas, rechazadas = guardar_historial(config, filas) if filas else (0, [])
+        for fila, error in rechazadas:
+            print(f"Supabase rechazó la búsqueda de {fila['tema']}: {' '.join(str(error).split())}", file=sys.stderr)
+        if volcadas and not args.silencioso:
+            print("Supabase no respondió: las búsquedas quedan pendientes de guardar", file=sys.stderr)
+
+    traza.etapas.append({'etapa': 'cli', 'ms': traza.total_ms()})
+    registro.registrar("cli", traza.etapas, temas=len(args.temas))
+
+    incompletos = [tema for tema, (resultado, error) in por_tema.items() if error is not None or resultado['fallidos']]
+    if incompletos and not args.silencioso:
+        print(f"{len(incompletos)} de {len(args.temas)} temas sin completar", file=sys.stderr)
+    return 1 if incompletos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
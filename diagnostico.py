@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Medición por etapas de una ejecución del script (webhook, estadísticas,
+# gráficos, exportaciones...). Se crea de nuevo en cada rerun y admite
+# etapas registradas desde los hilos del pool.
+class Traza:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = []
+        self._lock = threading.Lock()
+    
+    # with traza.medir("pdf") as datos: ... datos['bytes'] = n
+    @contextmanager
+    def medir(self, etapa, **datos):
+        inicio = time.perf_counter()
+        try:
+            yield datos
+        except Exception as e:
+            datos['error'] = type(e).__name__
+            raise
+        finally:
+            medida = {'etapa': etapa, 'ms': round((time.perf_counter() - inicio) * 1000, 1), **datos}
+            with self._lock:
+                self.etapas.append(medida)
+    
+    def total_ms(self):
+        return round((time.perf_counter() - self.inicio) * 1000, 1)
+
+# Registro de diagnóstico compartido: una línea JSON por ejecución o evento
+# en un archivo rotativo, y totales por etapa en memoria para el panel
+class RegistroDiagnostico:
+    def __init__(self, ruta, max_bytes, copias):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        manejador = RotatingFileHandler(ruta, maxBytes=max_bytes, backupCount=copias, encoding="utf-8")
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger("articulos.diagnostico")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        # Sustituir (no añadir) por si la caché del recurso se reinicia
+        self._logger.handlers = [manejador]
+        self._totales = {}
+        self._lock = threading.Lock()
+    
+    def registrar(self, tipo, etapas, **datos):
+        linea = {'fecha': datetime.now().isoformat(timespec='milliseconds'), 'tipo': tipo, **datos, 'etapas': etapas}
+        self._logger.info(json.dumps(linea, ensure_ascii=False, default=str))
+        with self._lock:
+            for medida in etapas:
+                total = self._totales.setdefault(medida['etapa'], {'veces': 0, 'ms_total': 0.0, 'ms_max': 0.0})
+                total['veces'] += 1
+                total['ms_total'] += medida['ms']
+                total['ms_max'] = max(total['ms_max'], medida['ms'])
+    
+    def totales(self):
+        with self._lock:
+            return {etapa: dict(valores) for etapa, valores in self._totales.items()}
+
+# Bytes que ocupa "valor" contando lo que contiene: tablas de pandas con
+# memory_usage(deep=True), arrays por sus datos y contenedores recorridos
+# (cada objeto una sola vez, aunque aparezca en varios sitios)
+def tamaño_profundo(valor, vistos=None):
+    vistos = set() if vistos is None else vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    if hasattr(valor, 'memory_usage'):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if hasattr(uso, 'sum') else uso)
+    if hasattr(valor, 'nbytes'):
+        return int(valor.nbytes)
+    total = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        total += sum(tamaño_profundo(k, vistos) + tamaño_profundo(v, vistos) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple, set, frozenset)):
+        total += sum(tamaño_profundo(elemento, vistos) for elemento in valor)
+    return total
+
+def crear_registro_diagnostico(config):
+    return RegistroDiagnostico(
+        ruta=config("diagnostico_log_path", ".cache/diagnostico.jsonl"),
+        max_bytes=int(config("diagnostico_log_mb", 5)) * 1024 * 1024,
+        copias=int(config("diagnostico_log_copias", 3))
+    )
@@ -0,0 +1,269 @@
+import bisect
+import math
+
+import numpy as np
+import pandas as pd
+
+from busqueda import normalizar_texto
+
+# Columnas cortas y repetitivas como categorías; el texto largo en buffers
+# de Arrow (fuera del heap de Python, sin un objeto str por celda)
+COLUMNAS_CATEGORICAS = ['fuente', 'venue', 'idioma', 'año', 'tema']
+TIPO_TEXTO = 'string[pyarrow]'
+
+# Construir la tabla columnar tipada que se guarda en la sesión
+def construir_tabla_resultados(resultados):
+    tabla = pd.DataFrame(resultados)
+    for columna in tabla.columns:
+        valores = tabla[columna].where(tabla[columna].notna(), '').astype(str)
+        if columna in COLUMNAS_CATEGORICAS:
+            tabla[columna] = valores.astype('category')
+        else:
+            tabla[columna] = valores.astype(TIPO_TEXTO)
+    año = tabla['año'].astype(str) if 'año' in tabla.columns else pd.Series('', index=tabla.index)
+    tabla['año_num'] = pd.to_numeric(año, errors='coerce').astype('Int16')
+    return tabla
+
+# Normalizar nombres de autor (mayúsculas, acentos, puntos de iniciales) de forma vectorizada
+def normalizar_autores(nombres):
+    return (
+        nombres.str.normalize('NFKD')
+        .str.encode('ascii', 'ignore')
+        .str.decode('ascii')
+        .str.lower()
+        .str.replace(r'[.\-]', ' ', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
+# Función para calcular estadísticas.
+# Devuelve (stats, df, autores_frecuencia) donde autores_frecuencia es una
+# tabla Autor/Publicaciones ordenada de mayor a menor.
+def calcular_estadisticas(resultados):
+    tabla = resultados if isinstance(resultados, pd.DataFrame) else construir_tabla_resultados(resultados)
+    
+    # Descartar filas sin año (sin copiar si todas lo tienen)
+    con_año = tabla['año_num'].notna()
+    df = tabla if con_año.all() else tabla[con_año]
+    
+    # Separar autores con operaciones de texto de pandas (sin bucles en Python)
+    autores = df['autores'] if 'autores' in df.columns else pd.Series(dtype=object)
+    autores = autores[autores.notna() & (autores != 'No especificado') & (autores != '')].astype(str)
+    nombres = autores.str.split(',').explode().str.strip()
+    nombres = nombres[nombres.notna() & (nombres != '')]
+    tabla_autores = pd.DataFrame({'clave': normalizar_autores(nombres), 'Autor': nombres})
+    tabla_autores = tabla_autores[tabla_autores['clave'] != '']
+    
+    # Cada autor se muestra con su grafía más frecuente
+    pares = tabla_autores.value_counts(['clave', 'Autor']).reset_index(name='Publicaciones')
+    autores_frecuencia = (
+        pares.groupby('clave', sort=False)
+        .agg(Autor=('Autor', 'first'), Publicaciones=('Publicaciones', 'sum'))
+        .sort_values('Publicaciones', ascending=False, kind='stable')
+        .reset_index(drop=True)
+    )
+    
+    stats = {
+        'total': len(tabla),
+        'año_min': int(df['año_num'].min()) if not df.empty else 0,
+        'año_max': int(df['año_num'].max()) if not df.empty else 0,
+        'autores_unicos': len(autores_frecuencia),
+        'fuentes': [f for f in df['fuente'].unique().tolist() if f] if 'fuente' in df.columns else []
+    }
+    
+    return stats, df, autores_frecuencia
+
+# Estadísticas de cada tema de una búsqueda por lotes, sobre la tabla con
+# los artículos de todos los temas y su columna "tema" (antes de deduplicar
+# entre temas). Una fila por tema, en el orden en que aparecen.
+def estadisticas_por_tema(tabla):
+    grupos = tabla.groupby('tema', observed=True, sort=False)
+    resumen = pd.DataFrame({
+        'Artículos': grupos.size(),
+        'Año mín.': grupos['año_num'].min(),
+        'Año máx.': grupos['año_num'].max(),
+    })
+    if 'fuente' in tabla.columns:
+        fuentes = tabla[tabla['fuente'] != ''].groupby('tema', observed=True)['fuente'].nunique()
+        resumen['Fuentes'] = fuentes.reindex(resumen.index, fill_value=0)
+    if 'autores' in tabla.columns:
+        con_autores = tabla.loc[(tabla['autores'] != '') & (tabla['autores'] != 'No especificado'), ['tema', 'autores']]
+        nombres = con_autores.assign(autor=con_autores['autores'].astype(str).str.split(',')).explode('autor')
+        claves = pd.DataFrame({'tema': nombres['tema'], 'clave': normalizar_autores(nombres['autor'].str.strip())})
+        claves = claves[claves['clave'] != '']
+        autores = claves.groupby('tema', observed=True)['clave'].nunique()
+        resumen['Autores Únicos'] = autores.reindex(resumen.index, fill_value=0)
+    return resumen.rename_axis('Tema').reset_index()
+
+# Índices de posiciones por año y por fuente, y órdenes precalculados, para
+# que filtrar y ordenar la lista de artículos sea solo buscar en arrays
+def construir_indices_articulos(df):
+    años = df['año_num'].to_numpy(dtype='int64')
+    titulos = df['titulo'].to_numpy(dtype=object) if 'titulo' in df.columns else np.zeros(len(df), dtype=object)
+    return {
+        'total': len(df),
+        'por_año': df.groupby('año_num', observed=True).indices,
+        'por_fuente': df.groupby('fuente', observed=True).indices if 'fuente' in df.columns else {},
+        'ordenes': {
+            "Más recientes": np.argsort(-años, kind='stable'),
+            "Más antiguos": np.argsort(años, kind='stable'),
+            "Título": np.argsort(titulos, kind='stable'),
+        }
+    }
+
+# Posiciones (en el orden pedido) de las filas que cumplen los filtros.
+# "coincidencias" son las posiciones devueltas por la búsqueda de texto,
+# ya ordenadas por relevancia.
+def filtrar_posiciones(indices, año_filtro, fuente_filtro, orden, coincidencias=None):
+    if orden == "Relevancia":
+        orden_posiciones = coincidencias
+    else:
+        orden_posiciones = indices['ordenes'][orden]
+    
+    grupos = []
+    if coincidencias is not None and orden != "Relevancia":
+        grupos.append(coincidencias)
+    if año_filtro != "Todos":
+        grupos.append(indices['por_año'].get(año_filtro, []))
+    if fuente_filtro != "Todas":
+        grupos.append(indices['por_fuente'].get(fuente_filtro, []))
+    if not grupos:
+        return orden_posiciones
+    
+    mascara = np.ones(indices['total'], dtype=bool)
+    for posiciones in grupos:
+        seleccion = np.zeros(indices['total'], dtype=bool)
+        seleccion[posiciones] = True
+        mascara &= seleccion
+    return orden_posiciones[mascara[orden_posiciones]]
+
+# Búsqueda de texto dentro de los resultados: índice invertido con BM25
+CAMPOS_BUSQUEDA_TEXTO = ['titulo', 'resumen', 'palabras_clave', 'objetivo', 'metodologia']
+PALABRAS_VACIAS = {
+    'a', 'al', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'con', 'de', 'del', 'el', 'en', 'es',
+    'for', 'from', 'in', 'is', 'la', 'las', 'los', 'lo', 'of', 'on', 'or', 'para', 'por', 'que',
+    'se', 'su', 'the', 'to', 'un', 'una', 'with', 'y', 'o'
+}
+BM25_K1 = 1.5
+BM25_B = 0.75
+MAX_EXPANSIONES_PREFIJO = 50
+
+# Índice invertido sobre las posiciones de df
+def construir_indice_texto(df):
+    campos = [c for c in CAMPOS_BUSQUEDA_TEXTO if c in df.columns]
+    texto = pd.Series('', index=range(len(df)), dtype=object)
+    for campo in campos:
+        texto = texto + ' ' + df[campo].astype(str).to_numpy(dtype=object)
+    
+    # Plegado de acentos y minúsculas, igual que normalizar_texto pero vectorizado
+    terminos = (
+        texto.str.normalize('NFKD')
+        .str.encode('ascii', 'ignore')
+        .str.decode('ascii')
+        .str.lower()
+        .str.replace(r'[^a-z0-9]+', ' ', regex=True)
+        .str.split()
+        .explode()
+    )
+    terminos = terminos[terminos.notna()]
+    terminos = terminos[(terminos.str.len() > 1) & ~terminos.isin(PALABRAS_VACIAS)]
+    pares = pd.DataFrame({'termino': terminos.to_numpy(dtype=object), 'doc': terminos.index.to_numpy()})
+    
+    frecuencias = pares.groupby(['termino', 'doc'], sort=False).size().reset_index(name='tf')
+    docs = frecuencias['doc'].to_numpy(dtype=np.int64)
+    tfs = frecuencias['tf'].to_numpy(dtype=np.float64)
+    postings = {
+        termino: (docs[filas], tfs[filas])
+        for termino, filas in frecuencias.groupby('termino', sort=True).indices.items()
+    }
+    longitudes = np.bincount(pares['doc'].to_numpy(dtype=np.int64), minlength=len(df)).astype(np.float64)
+    return {
+        'total': len(df),
+        'postings': postings,
+        'vocabulario': sorted(postings),
+        'longitudes': longitudes,
+        'longitud_media': longitudes.mean() if len(df) else 0.0,
+    }
+
+# Devuelve las posiciones que coinciden con la consulta, de mayor a menor
+# puntuación BM25. El último término se trata como prefijo (búsqueda al escribir).
+def buscar_en_indice(indice, consulta):
+    terminos = [t for t in normalizar_texto(consulta).split() if t not in PALABRAS_VACIAS]
+    if not terminos or indice['total'] == 0:
+        return np.array([], dtype=np.int64)
+    
+    expandidos = set(terminos[:-1])
+    ultimo = terminos[-1]
+    vocabulario = indice['vocabulario']
+    desde = bisect.bisect_left(vocabulario, ultimo)
+    for termino in vocabulario[desde:desde + MAX_EXPANSIONES_PREFIJO]:
+        if not termino.startswith(ultimo):
+            break
+        expandidos.add(termino)
+    
+    puntuaciones = np.zeros(indice['total'])
+    normalizacion = BM25_K1 * (1 - BM25_B + BM25_B * indice['longitudes'] / max(indice['longitud_media'], 1e-9))
+    for termino in expandidos:
+        if termino not in indice['postings']:
+            continue
+        docs, tfs = indice['postings'][termino]
+        idf = math.log(1 + (indice['total'] - len(docs) + 0.5) / (len(docs) + 0.5))
+        puntuaciones[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + normalizacion[docs])
+    
+    posiciones = np.flatnonzero(puntuaciones > 0)
+    return posiciones[np.argsort(-puntuaciones[posiciones], kind='stable')]
+
+# Tablas de conteo de los gráficos
+def calcular_agregados_graficos(df, autores_frecuencia):
+    fuentes_count = df['fuente'].value_counts()
+    return {
+        'por_año': df['año_num'].value_counts().sort_index(),
+        'autores': autores_frecuencia.head(15),
+        'fuentes': fuentes_count[fuentes_count > 0]
+    }
+
+# Figura de Plotly de un tipo de gráfico (el tema va en un título)
+def construir_figura(tipo, tema, agregados):
+    # Plotly se importa solo cuando se pinta el primer gráfico
+    import plotly.express as px
+    
+    if tipo == 'años':
+        publicaciones_por_año = agregados['por_año']
+        fig = px.bar(
+            x=publicaciones_por_año.index,
+            y=publicaciones_por_año.values,
+            labels={'x': 'Año', 'y': 'Número de Publicaciones'},
+            title=f'Distribución Temporal de Publicaciones - {tema}'
+        )
+        fig.update_traces(marker_color='#1f77b4')
+        fig.update_layout(showlegend=False, height=400)
+    elif tipo == 'autores':
+        fig = px.bar(
+            agregados['autores'],
+            x='Publicaciones',
+            y='Autor',
+            orientation='h',
+            title='Top 15 Autores con Más Publicaciones'
+        )
+        fig.update_traces(marker_color='#2ca02c')
+        fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+    elif tipo == 'fuentes_pie':
+        fuentes_count = agregados['fuentes']
+        fig = px.pie(
+            values=fuentes_count.values,
+            names=fuentes_count.index,
+            title='Porcentaje por Fuente'
+        )
+        fig.update_layout(height=400)
+    else:
+        fuentes_count = agregados['fuentes']
+        fig = px.bar(
+            x=fuentes_count.index,
+            y=fuentes_count.values,
+            labels={'x': 'Fuente', 'y': 'Cantidad'},
+            title='Artículos por Fuente'
+        )
+        fig.update_traces(marker_color='#ff7f0e')
+        fig.update_layout(height=400)
+    return fig
+
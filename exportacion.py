@@ -0,0 +1,220 @@
+import gzip
+import io
+import multiprocessing
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from busqueda import VALORES_VACIOS, SingleFlight
+
+# Recorrer los resultados (tabla o lista de dicts) fila a fila como
+# diccionarios, sin materializarlos enteros
+def iterar_articulos(resultados):
+    if isinstance(resultados, list):
+        yield from resultados
+        return
+    columnas = list(resultados.columns)
+    for valores in resultados.itertuples(index=False, name=None):
+        yield dict(zip(columnas, valores))
+
+# Función para crear PDF (ver reporte_pdf.crear_pdf). ReportLab se importa
+# aquí y no al cargar el módulo: solo lo paga quien pide un PDF.
+def crear_pdf(resultados, tema, stats, **opciones):
+    from reporte_pdf import crear_pdf as crear
+    return crear(resultados, tema, stats, **opciones)
+
+# Pool de procesos para renderizar por secciones los PDF muy grandes.
+# "spawn" evita heredar por fork los hilos y sockets del servidor.
+def crear_pool_pdf(config):
+    return ProcessPoolExecutor(
+        max_workers=int(config("pdf_max_procesos", min(4, os.cpu_count() or 1))),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+# Reportes exportados (PDF...) guardados en disco por hash de contenido.
+# Se desalojan los de uso más antiguo (mtime) al superar el límite total, y
+# las generaciones simultáneas del mismo reporte se coalescen (single-flight).
+class CacheExportaciones:
+    def __init__(self, directorio, max_bytes_total):
+        self.directorio = directorio
+        self.max_bytes_total = max_bytes_total
+        self._en_curso = SingleFlight()
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+    
+    # Ruta del reporte; "generar(archivo)" solo se llama si aún no existe
+    def obtener(self, clave, extension, generar):
+        ruta = os.path.join(self.directorio, f"{clave}.{extension}")
+        try:
+            os.utime(ruta)
+            return ruta
+        except FileNotFoundError:
+            return self._en_curso.ejecutar(ruta, lambda: self._generar(ruta, generar))
+    
+    def _generar(self, ruta, generar):
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporal, "wb") as archivo:
+                generar(archivo)
+            os.replace(temporal, ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        self._desalojar(conservar=ruta)
+        return ruta
+    
+    def _desalojar(self, conservar):
+        with self._lock:
+            archivos = []
+            for nombre in os.listdir(self.directorio):
+                ruta = os.path.join(self.directorio, nombre)
+                if nombre.endswith(".tmp") or ruta == conservar:
+                    continue
+                try:
+                    info = os.stat(ruta)
+                except FileNotFoundError:
+                    continue
+                archivos.append((info.st_mtime, info.st_size, ruta))
+            total = sum(tamaño for _, tamaño, _ in archivos)
+            try:
+                total += os.path.getsize(conservar)
+            except FileNotFoundError:
+                pass
+            for _, tamaño, ruta in sorted(archivos):
+                if total <= self.max_bytes_total:
+                    break
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+                total -= tamaño
+
+# Filas por bloque al volcar exportaciones: cada bloque se serializa y se
+# escribe antes de leer el siguiente, sin una segunda copia completa de la tabla
+FILAS_POR_BLOQUE = 5000
+# Columnas calculadas por la app que no forman parte del artículo
+COLUMNAS_DERIVADAS = {'año_num'}
+
+def _bloques(tabla, filas_por_bloque=FILAS_POR_BLOQUE):
+    columnas = [c for c in tabla.columns if c not in COLUMNAS_DERIVADAS]
+    # Siempre al menos un bloque, para que una tabla vacía tenga cabecera/esquema
+    for inicio in range(0, max(len(tabla), 1), filas_por_bloque):
+        yield tabla.iloc[inicio:inicio + filas_por_bloque][columnas]
+
+# Escribir texto sobre "salida" (binaria), opcionalmente comprimido con gzip
+def _escribir_texto(salida, escribir, comprimido=False, encoding='utf-8'):
+    destino = gzip.GzipFile(fileobj=salida, mode='wb', compresslevel=6, mtime=0) if comprimido else salida
+    texto = io.TextIOWrapper(destino, encoding=encoding, newline='')
+    escribir(texto)
+    texto.flush()
+    texto.detach()
+    if comprimido:
+        destino.close()
+
+def _valor(art, campo):
+    valor = art.get(campo)
+    if valor is None or str(valor).strip() in VALORES_VACIOS:
+        return ''
+    return str(valor).strip()
+
+def _separar(valor, separadores=r'[,;]'):
+    return [parte.strip() for parte in re.split(separadores, valor) if parte.strip()]
+
+# Función para exportar CSV (utf-8 con BOM para Excel), opcionalmente gzip
+def exportar_csv(tabla, salida, comprimido=False):
+    def escribir(texto):
+        for numero, bloque in enumerate(_bloques(tabla)):
+            bloque.to_csv(texto, header=(numero == 0), index=False)
+    _escribir_texto(salida, escribir, comprimido, encoding='utf-8-sig')
+
+# Función para exportar JSON Lines (un artículo por línea), opcionalmente gzip
+def exportar_jsonl(tabla, salida, comprimido=False):
+    def escribir(texto):
+        for bloque in _bloques(tabla):
+            if bloque.empty:
+                continue
+            lineas = bloque.to_json(orient='records', lines=True, force_ascii=False)
+            texto.write(lineas if lineas.endswith('\n') else lineas + '\n')
+    _escribir_texto(salida, escribir, comprimido)
+
+# Función para exportar Parquet: un row group por bloque
+def exportar_parquet(tabla, salida):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    escritor = None
+    try:
+        for bloque in _bloques(tabla):
+            lote = pa.Table.from_pandas(bloque, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(salida, lote.schema, compression='zstd')
+            escritor.write_table(lote)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+def _escapar_bibtex(valor):
+    return re.sub(r'[{}&%$#_\\]', lambda m: r'\textbackslash{}' if m.group() == '\\' else '\\' + m.group(), valor)
+
+# Clave BibTeX legible en ASCII (apellido + año + primera palabra del título),
+# única en el archivo; "usadas" cuenta cuántas veces salió cada base
+def _clave_bibtex(art, usadas):
+    autores = _separar(_valor(art, 'autores'))
+    apellido = autores[0].split()[-1] if autores else 'anonimo'
+    palabras = re.findall(r'\w+', _valor(art, 'titulo'))
+    base = f"{apellido}{_valor(art, 'año')}{palabras[0] if palabras else ''}"
+    base = unicodedata.normalize('NFKD', base).encode('ascii', 'ignore').decode('ascii')
+    base = re.sub(r'[^A-Za-z0-9]', '', base).lower() or 'articulo'
+    repeticiones = usadas.get(base, 0)
+    usadas[base] = repeticiones + 1
+    return f"{base}{repeticiones + 1}" if repeticiones else base
+
+# Función para exportar BibTeX (gestores de referencias: Zotero, Mendeley, JabRef...)
+def exportar_bibtex(tabla, salida):
+    campos = [('title', 'titulo'), ('year', 'año'), ('journal', 'venue'), ('doi', 'doi'),
+              ('url', 'url'), ('abstract', 'resumen'), ('keywords', 'palabras_clave')]
+    
+    def escribir(texto):
+        usadas = {}
+        for art in iterar_articulos(tabla):
+            lineas = [f"@article{{{_clave_bibtex(art, usadas)},"]
+            autores = _separar(_valor(art, 'autores'))
+            if autores:
+                lineas.append(f"  author = {{{_escapar_bibtex(' and '.join(autores))}}},")
+            for campo_bibtex, campo in campos:
+                valor = _valor(art, campo)
+                if valor:
+                    lineas.append(f"  {campo_bibtex} = {{{_escapar_bibtex(valor)}}},")
+            lineas.append("}")
+            texto.write("\n".join(lineas) + "\n\n")
+    _escribir_texto(salida, escribir)
+
+# Función para exportar RIS (formato de intercambio de EndNote y otros gestores)
+def exportar_ris(tabla, salida):
+    campos = [('TI', 'titulo'), ('PY', 'año'), ('JO', 'venue'), ('DO', 'doi'),
+              ('UR', 'url'), ('AB', 'resumen'), ('DB', 'fuente')]
+    
+    def escribir(texto):
+        for art in iterar_articulos(tabla):
+            lineas = ["TY  - JOUR"]
+            lineas.extend(f"AU  - {autor}" for autor in _separar(_valor(art, 'autores')))
+            for etiqueta, campo in campos:
+                valor = _valor(art, campo)
+                if valor:
+                    lineas.append(f"{etiqueta}  - {' '.join(valor.split())}")
+            lineas.extend(f"KW  - {palabra}" for palabra in _separar(_valor(art, 'palabras_clave')))
+            lineas.append("ER  - ")
+            texto.write("\r\n".join(lineas) + "\r\n\r\n")
+    _escribir_texto(salida, escribir)
+
+# Formatos de exportación por extensión: (etiqueta, tipo MIME, función(tabla, salida))
+FORMATOS_EXPORTACION = {
+    'csv': ("CSV", "text/csv", exportar_csv),
+    'csv.gz': ("CSV comprimido (.csv.gz)", "application/gzip", lambda tabla, salida: exportar_csv(tabla, salida, comprimido=True)),
+    'jsonl.gz': ("JSON Lines comprimido (.jsonl.gz)", "application/gzip", lambda tabla, salida: exportar_jsonl(tabla, salida, comprimido=True)),
+    'parquet': ("Parquet", "application/vnd.apache.parquet", exportar_parquet),
+    'bib': ("BibTeX", "application/x-bibtex", exportar_bibtex),
+    'ris': ("RIS", "application/x-research-info-systems", exportar_ris),
+}
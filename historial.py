@@ -0,0 +1,199 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+COLUMNAS_HISTORIAL = "tema, fecha_inicio, fecha_fin, idioma, total_resultados, fecha_busqueda"
+HISTORIAL_POR_PAGINA = 10
+
+# Crear un cliente de Supabase. El paquete se importa aquí y no al cargar el
+# módulo: solo lo paga quien abre el historial o guarda una búsqueda.
+def crear_cliente(url, key):
+    from supabase import create_client
+    return create_client(url, key)
+
+# Página del historial con paginación por cursor (keyset) sobre fecha_busqueda.
+# Devuelve (filas, cursor_siguiente); cursor_siguiente es None en la última página.
+def leer_pagina_historial(cliente, cursor=None, limite=HISTORIAL_POR_PAGINA):
+    consulta = cliente.table("busquedas").select(COLUMNAS_HISTORIAL).order("fecha_busqueda", desc=True)
+    if cursor:
+        consulta = consulta.lt("fecha_busqueda", cursor)
+    filas = consulta.limit(limite + 1).execute().data
+    cursor_siguiente = filas[limite - 1]['fecha_busqueda'] if len(filas) > limite else None
+    filas = filas[:limite]
+    for fila in filas:
+        fila['fecha_busqueda'] = datetime.fromisoformat(fila['fecha_busqueda']).strftime('%d/%m/%Y %H:%M')
+    return filas, cursor_siguiente
+
+# Agregados por tema calculados en la base de datos (ver supabase/historial.sql)
+def leer_resumen_temas(cliente, limite=10):
+    return cliente.rpc("resumen_busquedas_por_tema", {"limite": limite}).execute().data
+
+# Fila de la tabla "busquedas" para una búsqueda realizada ahora
+def fila_busqueda(tema, fecha_inicio, fecha_fin, idioma, total_resultados):
+    return {
+        "tema": tema,
+        "fecha_inicio": fecha_inicio.strftime("%Y-%m-%d"),
+        "fecha_fin": fecha_fin.strftime("%Y-%m-%d"),
+        "idioma": idioma,
+        "total_resultados": total_resultados,
+        "fecha_busqueda": datetime.now().isoformat()
+    }
+
+# Añadir filas al archivo de pendientes; EscritorHistorial las reenvía
+# cuando Supabase vuelve a responder
+def volcar_pendientes(ruta, filas):
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    with open(ruta, "a", encoding="utf-8") as archivo:
+        for fila in filas:
+            archivo.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+# Clases SQLSTATE que se arreglan reintentando: conexión (08), transacción
+# abortada (40), recursos (53), intervención del operador (57) y sistema (58)
+SQLSTATE_TRANSITORIOS = ("08", "40", "53", "57", "58")
+
+# Rechazo que no se arregla reintentando porque lo causan las filas o el
+# esquema (datos inválidos, restricciones, columnas que no existen: un 4xx).
+# Los errores de red, los 5xx, los límites de tasa y los de credenciales no
+# lo son: esas filas se reintentan y, si hace falta, van al archivo.
+def error_permanente(error):
+    from postgrest.exceptions import APIError
+    if not isinstance(error, APIError):
+        return False
+    codigo = str(error.code or "")
+    if codigo.isdigit() and len(codigo) == 3:
+        # Respuesta sin JSON: el código es el estado HTTP
+        return 400 <= int(codigo) < 500 and codigo not in ("401", "403", "408", "429")
+    if codigo.startswith("PGRST"):
+        # PGRST1xx: petición inválida; PGRST2xx: esquema (tabla o columna)
+        return codigo[5:6] in ("1", "2")
+    return len(codigo) == 5 and not codigo.startswith(SQLSTATE_TRANSITORIOS)
+
+# Escritor del historial en segundo plano: una cola acotada que un hilo
+# vacía por lotes, con reintentos y volcado a un archivo local si Supabase
+# no responde. Las filas volcadas se reenvían cuando la cola está ociosa;
+# las que Supabase rechaza por sí mismas se registran y se descartan.
+# "crear_cliente" se llama desde el hilo en la primera inserción.
+class EscritorHistorial:
+    def __init__(self, crear_cliente, ruta_pendientes, max_cola, tamaño_lote, espera_lote,
+                 reintentos, backoff_base, intervalo_reenvio, al_escribir=None, registro=None):
+        self._crear_cliente = crear_cliente
+        self._cliente = None
+        self._al_escribir = al_escribir
+        self._registro = registro
+        self._ruta_pendientes = ruta_pendientes
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._lock_archivo = threading.Lock()
+        self.tamaño_lote = tamaño_lote
+        self.espera_lote = espera_lote
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.intervalo_reenvio = intervalo_reenvio
+        self.escritas = 0
+        self.pendientes = 0
+        self.descartadas = 0
+        
+        directorio = os.path.dirname(ruta_pendientes)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        threading.Thread(target=self._trabajar, name="escritor-historial", daemon=True).start()
+    
+    # Filas que se insertan juntas en una misma llamada (búsquedas por lotes).
+    # Nunca bloquea: si la cola está llena, las filas van directas al archivo.
+    def encolar_lote(self, filas):
+        try:
+            self._cola.put_nowait(list(filas))
+        except queue.Full:
+            self._volcar(filas)
+    
+    def estado(self):
+        return {
+            'en_cola': self._cola.qsize(),
+            'escritas': self.escritas,
+            'pendientes': self.pendientes,
+            'descartadas': self.descartadas,
+        }
+    
+    def _conectar(self):
+        if self._cliente is None:
+            self._cliente = self._crear_cliente()
+        return self._cliente
+    
+    def _trabajar(self):
+        while True:
+            try:
+                lote = self._cola.get(timeout=self.intervalo_reenvio)
+            except queue.Empty:
+                self._reenviar_pendientes()
+                continue
+            limite = time.monotonic() + self.espera_lote
+            while len(lote) < self.tamaño_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.extend(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            pendientes = self._insertar(lote)
+            if pendientes:
+                self._volcar(pendientes)
+    
+    # Devuelve las filas que hay que guardar en el archivo para reenviarlas
+    # (ninguna si se insertaron o se descartaron)
+    def _insertar(self, lote):
+        inicio = time.perf_counter()
+        for intento in range(self.reintentos):
+            try:
+                self._conectar().table("busquedas").insert(lote).execute()
+                self.escritas += len(lote)
+                if self._registro:
+                    medida = {'etapa': 'supabase_insert', 'ms': round((time.perf_counter() - inicio) * 1000, 1),
+                              'filas': len(lote), 'intentos': intento + 1}
+                    self._registro.registrar("evento", [medida])
+                if self._al_escribir:
+                    self._al_escribir()
+                return []
+            except Exception as e:
+                if error_permanente(e):
+                    return self._separar_rechazadas(lote, e)
+                if intento < self.reintentos - 1:
+                    time.sleep(self.backoff_base * 2 ** intento * random.uniform(0.5, 1.5))
+        return lote
+    
+    # Un rechazo permanente de un lote puede deberse a una sola fila: se
+    # insertan de una en una para descartar solo las que Supabase rechaza
+    def _separar_rechazadas(self, lote, error):
+        if len(lote) > 1:
+            return [fila for una in lote for fila in self._insertar([una])]
+        self.descartadas += 1
+        if self._registro:
+            self._registro.registrar("historial_descartada", [], fila=lote[0], error=repr(error))
+        return []
+    
+    def _volcar(self, filas):
+        with self._lock_archivo:
+            volcar_pendientes(self._ruta_pendientes, filas)
+            self.pendientes += len(filas)
+    
+    def _reenviar_pendientes(self):
+        with self._lock_archivo:
+            if not os.path.exists(self._ruta_pendientes):
+                return
+            ruta_envio = self._ruta_pendientes + ".enviando"
+            os.replace(self._ruta_pendientes, ruta_envio)
+            self.pendientes = 0
+        with open(ruta_envio, encoding="utf-8") as archivo:
+            filas = [json.loads(linea) for linea in archivo if linea.strip()]
+        os.remove(ruta_envio)
+        for inicio in range(0, len(filas), self.tamaño_lote):
+            pendientes = self._insertar(filas[inicio:inicio + self.tamaño_lote])
+            if pendientes:
+                # Supabase sigue sin responder: devolver lo que falta al archivo
+                self._volcar(pendientes + filas[inicio + self.tamaño_lote:])
+                return
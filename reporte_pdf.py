@@ -0,0 +1,265 @@
+import os
+import tempfile
+from collections import deque
+from datetime import datetime
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
+from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
+from reportlab.lib import colors
+
+from exportacion import iterar_articulos
+
+# Artículos por sección cuando el PDF se reparte entre procesos. Múltiplo de 3 para que
+# los saltos de página (uno cada 3 artículos) queden igual que en un solo bloque.
+PDF_ARTICULOS_POR_SECCION = 300
+# Tamaño a partir del cual el PDF generado pasa de memoria a disco (si no se indica salida)
+PDF_MAX_MEMORIA = 8 * 1024 * 1024
+
+# Plantilla que va pidiendo los flowables a un iterador mientras maqueta, en
+# lugar de recibir la historia completa: de la historia solo hay una ventana
+# a la vez. ReportLab consume la lista por delante (del flowables[0]), así
+# que basta con rellenarla después de cada flowable procesado. Las páginas
+# ya maquetadas sí se quedan en memoria hasta guardar, así que el pico sigue
+# creciendo con el número de artículos (unos 10 MB por cada 1000).
+class _DocumentoIncremental(SimpleDocTemplate):
+    def __init__(self, salida, historia, ventana=60):
+        super().__init__(salida, pagesize=letter,
+                         topMargin=0.75*inch, bottomMargin=0.75*inch,
+                         leftMargin=0.75*inch, rightMargin=0.75*inch,
+                         pageCompression=1)
+        self._historia = historia
+        self._ventana = ventana
+        self._flowables = None
+    
+    def _rellenar(self, flowables):
+        while len(flowables) < self._ventana:
+            siguiente = next(self._historia, None)
+            if siguiente is None:
+                break
+            flowables.append(siguiente)
+    
+    def handle_flowable(self, flowables):
+        super().handle_flowable(flowables)
+        # ReportLab también llama aquí con sus listas internas (_hanging)
+        if flowables is self._flowables:
+            self._rellenar(flowables)
+    
+    def construir(self):
+        self._flowables = []
+        self._rellenar(self._flowables)
+        self.build(self._flowables)
+
+# Estilos personalizados
+def _estilos():
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#1f77b4'),
+            spaceAfter=20,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        'subtitle': ParagraphStyle(
+            'CustomSubtitle',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.grey,
+            spaceAfter=30,
+            alignment=TA_CENTER
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#1f77b4'),
+            spaceAfter=12,
+            spaceBefore=12,
+            fontName='Helvetica-Bold'
+        ),
+        'body': ParagraphStyle(
+            'CustomBody',
+            parent=styles['BodyText'],
+            fontSize=10,
+            alignment=TA_JUSTIFY,
+            spaceAfter=6
+        ),
+        'small': ParagraphStyle(
+            'SmallText',
+            parent=styles['BodyText'],
+            fontSize=9,
+            textColor=colors.grey,
+            spaceAfter=4
+        ),
+    }
+
+# Portada, resumen estadístico y encabezado de la lista de artículos
+def _flowables_portada(tema, stats, fecha, estilos):
+    story = []
+    story.append(Spacer(1, 1.5*inch))
+    story.append(Paragraph("📚 REPORTE DE BÚSQUEDA CIENTÍFICA", estilos['title']))
+    story.append(Spacer(1, 0.3*inch))
+    story.append(Paragraph(f"Tema: {tema}", estilos['subtitle']))
+    story.append(Paragraph(f"Fecha: {fecha}", estilos['subtitle']))
+    story.append(Spacer(1, 0.5*inch))
+
+    # Estadísticas resumen
+    story.append(Paragraph("📊 RESUMEN ESTADÍSTICO", estilos['heading']))
+
+    stats_data = [
+        ["Total de Artículos", str(stats['total'])],
+        ["Rango de Años", f"{stats['año_min']} - {stats['año_max']}"],
+        ["Autores Únicos", str(stats['autores_unicos'])],
+        ["Fuentes", ", ".join(stats['fuentes'])]
+    ]
+
+    stats_table = Table(stats_data, colWidths=[2.5*inch, 4*inch])
+    stats_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e6f2ff')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+    ]))
+
+    story.append(stats_table)
+    story.append(PageBreak())
+
+    # Artículos
+    story.append(Paragraph("📄 ARTÍCULOS ENCONTRADOS", estilos['heading']))
+    story.append(Spacer(1, 0.2*inch))
+    return story
+
+def _flowables_articulo(idx, art, estilos):
+    body_style = estilos['body']
+    small_style = estilos['small']
+    story = []
+
+    # Título del artículo
+    story.append(Paragraph(f"<b>{idx}. {art.get('titulo') or 'Sin título'}</b>", body_style))
+
+    # Información básica
+    info_lines = []
+    if art.get('autores') and art['autores'] != 'No especificado':
+        info_lines.append(f"<b>Autores:</b> {art['autores'][:200]}...")
+    info_lines.append(f"<b>Año:</b> {art.get('año') or 'N/A'}")
+    if art.get('venue'):
+        info_lines.append(f"<b>Publicado en:</b> {art['venue']}")
+    info_lines.append(f"<b>Fuente:</b> {art.get('fuente') or 'N/A'}")
+
+    for line in info_lines:
+        story.append(Paragraph(line, small_style))
+
+    # DOI y URL
+    if art.get('doi'):
+        story.append(Paragraph(f"<b>DOI:</b> {art['doi']}", small_style))
+    if art.get('url'):
+        story.append(Paragraph(f"<b>URL:</b> <link href='{art['url']}'>{art['url'][:80]}...</link>", small_style))
+
+    # Resumen
+    if art.get('resumen') and art['resumen'] != 'Resumen no disponible':
+        resumen_text = art['resumen'][:500] + "..." if len(art['resumen']) > 500 else art['resumen']
+        story.append(Paragraph(f"<b>Resumen:</b> {resumen_text}", body_style))
+
+    # Objetivo y Metodología
+    if art.get('objetivo') and art['objetivo'] != 'No especificado':
+        story.append(Paragraph(f"<b>Objetivo:</b> {art['objetivo'][:300]}", body_style))
+
+    if art.get('metodologia') and art['metodologia'] != 'No especificada':
+        story.append(Paragraph(f"<b>Metodología:</b> {art['metodologia'][:300]}", body_style))
+
+    # Palabras clave
+    if art.get('palabras_clave') and art['palabras_clave'] != 'No registradas':
+        story.append(Paragraph(f"<b>Palabras clave:</b> {art['palabras_clave'][:200]}", small_style))
+
+    story.append(Spacer(1, 0.15*inch))
+    story.append(Paragraph("_" * 100, small_style))
+    story.append(Spacer(1, 0.15*inch))
+    return story
+
+# Flowables del reporte generados a medida que se consumen
+def _historia(articulos, inicio, portada, estilos):
+    if portada:
+        yield from _flowables_portada(*portada, estilos)
+    for idx, art in enumerate(articulos, inicio):
+        # Nueva página cada 3 artículos
+        if idx > inicio and (idx - 1) % 3 == 0:
+            yield PageBreak()
+        yield from _flowables_articulo(idx, art, estilos)
+
+# Escribir en "salida" un PDF con los artículos numerados desde "inicio".
+# "portada" es (tema, stats, fecha) o None para secciones intermedias.
+def _escribir_pdf(salida, articulos, inicio=1, portada=None):
+    _DocumentoIncremental(salida, _historia(articulos, inicio, portada, _estilos())).construir()
+
+# Se ejecuta en los procesos del pool: renderiza una sección a un archivo
+def _renderizar_seccion(articulos, inicio, ruta, portada=None):
+    with open(ruta, "wb") as archivo:
+        _escribir_pdf(archivo, articulos, inicio, portada)
+    return ruta
+
+# Agrupar un iterador en listas de "tamaño" elementos sin materializarlo
+def _secciones(articulos, tamaño):
+    bloque = []
+    for art in articulos:
+        bloque.append(art)
+        if len(bloque) == tamaño:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+# Función para crear PDF: los artículos se leen y maquetan de uno en uno y
+# el resultado va a "salida" (o a un SpooledTemporaryFile que pasa a disco
+# al superar PDF_MAX_MEMORIA). Con un ProcessPoolExecutor los reportes
+# grandes se renderizan por secciones en paralelo y se concatenan con pypdf;
+# es más rápido, pero la unión carga el documento entero y el pico de memoria
+# es mayor que renderizándolo de una vez.
+def crear_pdf(resultados, tema, stats, salida=None, ejecutor=None,
+              articulos_por_seccion=PDF_ARTICULOS_POR_SECCION, max_en_vuelo=4):
+    if salida is None:
+        salida = tempfile.SpooledTemporaryFile(max_size=PDF_MAX_MEMORIA)
+    portada = (tema, stats, datetime.now().strftime('%d/%m/%Y %H:%M'))
+
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        PdfWriter = None
+    if ejecutor is None or PdfWriter is None or len(resultados) <= articulos_por_seccion:
+        _escribir_pdf(salida, iterar_articulos(resultados), portada=portada)
+        salida.seek(0)
+        return salida
+
+    with tempfile.TemporaryDirectory(prefix="reporte_pdf_") as directorio:
+        rutas = []
+        pendientes = deque()
+        secciones = _secciones(iterar_articulos(resultados), articulos_por_seccion)
+        for numero, bloque in enumerate(secciones):
+            # Pocas secciones en vuelo a la vez para no acumular bloques en memoria
+            pendientes.append(ejecutor.submit(
+                _renderizar_seccion,
+                bloque,
+                numero * articulos_por_seccion + 1,
+                os.path.join(directorio, f"seccion_{numero:05d}.pdf"),
+                portada if numero == 0 else None
+            ))
+            if len(pendientes) >= max_en_vuelo:
+                rutas.append(pendientes.popleft().result())
+        while pendientes:
+            rutas.append(pendientes.popleft().result())
+
+        escritor = PdfWriter()
+        for ruta in rutas:
+            escritor.append(ruta)
+        escritor.write(salida)
+        escritor.close()
+
+    salida.seek(0)
+    return salida
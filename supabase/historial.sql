@@ -0,0 +1,29 @@
+-- Objetos de base de datos que usa el panel de historial.
+-- Ejecutar una vez en el editor SQL de Supabase.
+
+-- Índice para paginar el historial por cursor sobre fecha_busqueda
+create index if not exists busquedas_fecha_busqueda_idx
+    on busquedas (fecha_busqueda desc);
+
+-- Temas más buscados y promedio de resultados por tema, agregados en la base
+-- de datos para no descargar las filas del historial
+create or replace function resumen_busquedas_por_tema(limite integer default 10)
+returns table (
+    tema text,
+    busquedas bigint,
+    promedio_resultados numeric,
+    ultima_busqueda timestamptz
+)
+language sql
+stable
+as $$
+    select
+        lower(trim(b.tema)) as tema,
+        count(*) as busquedas,
+        round(avg(b.total_resultados), 1) as promedio_resultados,
+        max(b.fecha_busqueda::timestamptz) as ultima_busqueda
+    from busquedas b
+    group by lower(trim(b.tema))
+    order by busquedas desc, ultima_busqueda desc
+    limit limite;
+$$;
@@ -0,0 +1,197 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+import requests
+
+from busqueda import (
+    CircuitoAbiertoError,
+    ClienteWebhook,
+    SingleFlight,
+    buscar_lote,
+    deduplicar_articulos,
+    rangos_faltantes,
+)
+
+TITULO = 'Deep learning methods for protein structure prediction in bacteria'
+
+# Deduplicación
+
+def test_dedup_mismo_doi_normalizado():
+    unicos, colapsados = deduplicar_articulos([
+        {'titulo': 'Título en CORE', 'doi': 'https://doi.org/10.1000/ABC'},
+        {'titulo': 'Otro título en CrossRef', 'doi': 'doi:10.1000/abc'},
+    ])
+    assert colapsados == 1
+    assert len(unicos) == 1
+
+def test_dedup_titulos_casi_iguales_fusiona_campos():
+    original = {'titulo': TITULO, 'año': '2021', 'autores': 'A. Pérez', 'resumen': 'N/A'}
+    variante = {'titulo': TITULO.replace('Deep learning', 'Deep-learning') + 's', 'año': '2021', 'resumen': 'Resumen completo'}
+    unicos, colapsados = deduplicar_articulos([original, variante])
+    assert colapsados == 1
+    assert unicos[0]['autores'] == 'A. Pérez'
+    assert unicos[0]['resumen'] == 'Resumen completo'
+    # La lista de entrada puede venir de la caché compartida: no se modifica
+    assert original['resumen'] == 'N/A'
+
+def test_dedup_mismo_titulo_en_otro_año_no_fusiona():
+    unicos, colapsados = deduplicar_articulos([
+        {'titulo': TITULO, 'año': '2021'},
+        {'titulo': TITULO, 'año': '2022'},
+    ])
+    assert colapsados == 0
+    assert len(unicos) == 2
+
+def test_dedup_mismo_titulo_con_doi_distinto_no_fusiona():
+    unicos, colapsados = deduplicar_articulos([
+        {'titulo': TITULO, 'año': '2021', 'doi': '10.1000/a'},
+        {'titulo': TITULO, 'año': '2021', 'doi': '10.1000/b'},
+    ])
+    assert colapsados == 0
+    assert len(unicos) == 2
+
+# Rangos que faltan respecto a la ventana ya cubierta
+
+def test_rangos_faltantes_ventana_cubierta():
+    assert rangos_faltantes(date(2020, 1, 1), date(2021, 12, 31), date(2020, 1, 1), date(2021, 12, 31)) == []
+
+def test_rangos_faltantes_dentro_de_lo_cubierto():
+    assert rangos_faltantes(date(2020, 6, 1), date(2020, 6, 30), date(2020, 1, 1), date(2021, 12, 31)) == []
+
+def test_rangos_faltantes_por_ambos_lados():
+    assert rangos_faltantes(date(2019, 1, 1), date(2022, 12, 31), date(2020, 1, 1), date(2021, 12, 31)) == [
+        (date(2019, 1, 1), date(2019, 12, 31)),
+        (date(2022, 1, 1), date(2022, 12, 31)),
+    ]
+
+def test_rangos_faltantes_un_dia_por_delante():
+    assert rangos_faltantes(date(2019, 12, 31), date(2021, 12, 31), date(2020, 1, 1), date(2021, 12, 31)) == [
+        (date(2019, 12, 31), date(2019, 12, 31)),
+    ]
+
+# Búsqueda por lotes
+
+def test_lote_sigue_si_un_tema_falla():
+    def buscar(tema):
+        if tema == 'roto':
+            raise OSError('disco lleno')
+        return tema.upper()
+    
+    avisos = []
+    por_tema = buscar_lote(['a', 'roto', 'b'], buscar, 2, lambda tema, resultado, error: avisos.append(tema))
+    assert list(por_tema) == ['a', 'roto', 'b']
+    assert por_tema['a'] == ('A', None)
+    assert por_tema['b'] == ('B', None)
+    assert por_tema['roto'][0] is None
+    assert isinstance(por_tema['roto'][1], OSError)
+    assert sorted(avisos) == ['a', 'b', 'roto']
+
+# Cortacircuitos del cliente del webhook
+
+class RespuestaFalsa:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.content = b'[]'
+    
+    def json(self):
+        return []
+    
+    def raise_for_status(self):
+        pass
+
+class SesionFalsa:
+    def __init__(self):
+        self.estados = []
+        self.llamadas = 0
+    
+    def post(self, url, json, timeout):
+        self.llamadas += 1
+        return RespuestaFalsa(self.estados.pop(0))
+
+def crear_cliente(enfriamiento=0.05):
+    cliente = ClienteWebhook(
+        url='http://prueba', timeout_conexion=1, timeout_lectura=1, reintentos=0,
+        backoff_base=0, umbral_fallos=2, enfriamiento=enfriamiento, max_conexiones=1
+    )
+    cliente._sesion = SesionFalsa()
+    return cliente
+
+def abrir_circuito(cliente):
+    cliente._sesion.estados = [503, 503]
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            cliente.post_json({})
+
+def test_circuito_se_abre_tras_fallos_consecutivos():
+    cliente = crear_cliente(enfriamiento=60)
+    abrir_circuito(cliente)
+    assert cliente.circuito_abierto()
+    with pytest.raises(CircuitoAbiertoError):
+        cliente.post_json({})
+    # Abierto: no llega a hacer la petición
+    assert cliente._sesion.llamadas == 2
+
+def test_circuito_semiabierto_se_cierra_si_la_prueba_responde():
+    cliente = crear_cliente()
+    abrir_circuito(cliente)
+    time.sleep(0.06)
+    assert not cliente.circuito_abierto()
+    cliente._sesion.estados = [200, 200]
+    assert cliente.post_json({}) == []
+    assert cliente.post_json({}) == []
+    assert not cliente.circuito_abierto()
+
+def test_circuito_semiabierto_solo_deja_pasar_una_prueba():
+    cliente = crear_cliente()
+    abrir_circuito(cliente)
+    time.sleep(0.06)
+    cliente._sesion.estados = [503]
+    with pytest.raises(requests.exceptions.HTTPError):
+        cliente.post_json({})
+    # La prueba falló: vuelve a abrirse sin esperar a otros fallos
+    assert cliente.circuito_abierto()
+    with pytest.raises(CircuitoAbiertoError):
+        cliente.post_json({})
+    assert cliente._sesion.llamadas == 3
+
+# Coalescencia de búsquedas idénticas
+
+def test_single_flight_una_sola_llamada_para_sesiones_concurrentes():
+    vuelo = SingleFlight()
+    empezo = threading.Event()
+    unido = threading.Event()
+    liberar = threading.Event()
+    llamadas = []
+    resultados = []
+    
+    def lenta():
+        llamadas.append(1)
+        empezo.set()
+        liberar.wait(5)
+        return ['articulo']
+    
+    lider = threading.Thread(target=lambda: resultados.append(vuelo.ejecutar('clave', lenta)))
+    lider.start()
+    empezo.wait(5)
+    seguidor = threading.Thread(target=lambda: resultados.append(vuelo.ejecutar('clave', lenta, al_unirse=unido.set)))
+    seguidor.start()
+    assert unido.wait(5)
+    liberar.set()
+    lider.join(5)
+    seguidor.join(5)
+    
+    assert llamadas == [1]
+    assert resultados == [['articulo'], ['articulo']]
+
+def test_single_flight_propaga_el_error_y_libera_la_clave():
+    vuelo = SingleFlight()
+    
+    def falla():
+        raise requests.exceptions.ConnectionError('sin red')
+    
+    with pytest.raises(requests.exceptions.ConnectionError):
+        vuelo.ejecutar('clave', falla)
+    # Terminada la llamada, la siguiente vuelve a ejecutarse
+    assert vuelo.ejecutar('clave', lambda: 'nuevo') == 'nuevo'
@@ -0,0 +1,20 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from diagnostico import tamaño_profundo
+
+def test_cuenta_el_contenido_de_los_contenedores():
+    texto = 'x' * 10000
+    assert tamaño_profundo([texto]) >= sys.getsizeof(texto)
+    assert tamaño_profundo({'clave': (texto,)}) >= sys.getsizeof(texto)
+
+def test_objetos_repetidos_se_cuentan_una_vez():
+    texto = 'x' * 10000
+    assert tamaño_profundo([texto, texto]) < 2 * sys.getsizeof(texto)
+
+def test_tablas_y_arrays_por_sus_datos():
+    df = pd.DataFrame({'resumen': ['y' * 1000] * 100})
+    assert tamaño_profundo(df) == int(df.memory_usage(deep=True).sum())
+    assert tamaño_profundo(np.zeros(1000)) == 8000
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from estadisticas import buscar_en_indice, construir_indice_texto
+
+def crear_indice():
+    df = pd.DataFrame({
+        'titulo': ['Redes neuronales en medicina', 'Aprendizaje automático', 'Redes de sensores'],
+        'resumen': ['Diagnóstico con redes neuronales profundas', 'Modelos de clasificación', 'Energía en nodos'],
+    })
+    return construir_indice_texto(df)
+
+def test_buscar_ordena_por_relevancia():
+    # "neuronales" aparece dos veces en el primero y nunca en el tercero
+    assert list(buscar_en_indice(crear_indice(), 'redes neuronales')) == [0, 2]
+
+def test_buscar_pliega_acentos_y_mayusculas():
+    assert list(buscar_en_indice(crear_indice(), 'AUTOMATICO')) == [1]
+    assert list(buscar_en_indice(crear_indice(), 'energia')) == [2]
+
+def test_buscar_ultimo_termino_como_prefijo():
+    assert list(buscar_en_indice(crear_indice(), 'clasif')) == [1]
+
+def test_buscar_sin_coincidencias_o_solo_palabras_vacias():
+    indice = crear_indice()
+    assert len(buscar_en_indice(indice, 'astronomia')) == 0
+    assert len(buscar_en_indice(indice, 'de la en')) == 0
+
+def test_buscar_en_tabla_vacia():
+    indice = construir_indice_texto(pd.DataFrame({'titulo': []}))
+    assert len(buscar_en_indice(indice, 'redes')) == 0
@@ -0,0 +1,20 @@
+import pytest
+import requests
+from postgrest.exceptions import APIError
+
+from historial import error_permanente
+
+def error_api(codigo):
+    return APIError({'code': codigo, 'message': 'rechazado'})
+
+@pytest.mark.parametrize('codigo', ['23505', '22P02', '42703', 'PGRST102', 'PGRST204', '400', '404', '422'])
+def test_rechazos_permanentes(codigo):
+    assert error_permanente(error_api(codigo))
+
+@pytest.mark.parametrize('codigo', ['08006', '40001', '53300', '57014', 'PGRST000', 'PGRST301', '401', '403', '408', '429', '500', '503', None])
+def test_errores_reintentables(codigo):
+    assert not error_permanente(error_api(codigo))
+
+def test_errores_de_red_no_son_permanentes():
+    assert not error_permanente(requests.exceptions.ConnectionError('sin red'))
+    assert not error_permanente(TimeoutError())